@@ -0,0 +1,206 @@
+"""
+differential_campaign.py
+Campaña diferencial NPCR/UACI sobre el cifrador real
+
+Para cada frame muestreado del video se toma el estado del cifrador en esa
+posición del stream (semilla + warmup + un paso caótico por frame previo) y,
+para cada posición (fila, columna, canal) elegida, se cifran con ese mismo
+estado el frame original y el frame con un solo píxel modificado. NPCR y
+UACI se calculan entre ambos ciphertexts; así solo difiere el plaintext,
+que es lo que mide la prueba diferencial.
+
+Los pares se agrupan en lotes (frame, estado, posiciones) que se reparten
+entre procesos: cada lote reconstruye el cifrador desde el estado y cifra
+el frame de referencia una sola vez.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from scipy.stats import norm
+
+from crypto.chaos_generator import ChaosKeyGenerator
+from crypto.aes_encryptor import AESCFBFrameEncryptor, AESCTRFrameEncryptor
+from crypto.mnk_encryptor import MNAKFrameEncryptor
+from analysis.differential_tests import modify_one_pixel, npcr, uaci
+
+SCHEMES = {
+    "aes-cfb": AESCFBFrameEncryptor,
+    "aes-ctr": AESCTRFrameEncryptor,
+    "mnak": MNAKFrameEncryptor,
+}
+
+
+def make_encryptor(scheme, seed=0.1, warmup=1000):
+    if scheme not in SCHEMES:
+        raise ValueError(f"Esquema desconocido: {scheme} (opciones: {', '.join(SCHEMES)})")
+    keygen = ChaosKeyGenerator(seed=seed)
+    keygen.step_many(warmup)
+    return SCHEMES[scheme](keygen)
+
+
+def _restore(scheme, state):
+    encryptor = SCHEMES[scheme](ChaosKeyGenerator.from_state(state["chaos"]))
+    encryptor.set_state(state)
+    return encryptor
+
+
+def _ciphertext(encryptor, state, frame):
+    # Copia plana: el cifrador MNAK devuelve una vista sobre su buffer
+    encryptor.set_state(state)
+    return np.array(encryptor.encrypt(frame), dtype=np.uint8).reshape(-1)
+
+
+def differential_batch(scheme, state, frame, positions):
+    """
+    NPCR y UACI (%) de cada posición del lote, todos con el mismo estado,
+    y el tamaño en bytes del ciphertext comparado.
+    """
+    encryptor = _restore(scheme, state)
+    reference = _ciphertext(encryptor, state, frame)
+
+    values = np.empty((len(positions), 2))
+    for i, position in enumerate(positions):
+        modified = _ciphertext(encryptor, state, modify_one_pixel(frame, tuple(position)))
+        values[i] = npcr(reference, modified), uaci(reference, modified)
+    return values, reference.size
+
+
+def sample_positions(shape, count, rng):
+    # (fila, columna[, canal]) uniformes sobre el frame
+    return np.stack([rng.integers(0, n, count) for n in shape], axis=1)
+
+
+def sample_frames(path, indices, size=None):
+    """
+    Frames BGR en los índices pedidos (ordenados), con una sola lectura
+    secuencial del video; redimensionados a `size` (ancho, alto) como en main.
+    """
+    wanted = set(int(i) for i in indices)
+    cap = cv2.VideoCapture(path)
+    index = 0
+    try:
+        while wanted:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index in wanted:
+                wanted.discard(index)
+                if size is not None:
+                    frame = cv2.resize(frame, tuple(size))
+                yield index, frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def npcr_critical(n_values, alpha=0.05):
+    """
+    Valor crítico N* (%) de NPCR para n_values bytes (Wu et al., 2011):
+    un ciphertext aleatorio supera N* con probabilidad 1 - alpha.
+    """
+    f = 255
+    return 100.0 * (f - norm.ppf(1 - alpha) * np.sqrt(f / n_values)) / (f + 1)
+
+
+def uaci_interval(n_values, alpha=0.05):
+    # Intervalo crítico (U*-, U*+) (%) de UACI (Wu et al., 2011)
+    f = 255
+    mu = (f + 2) / (3 * f + 3)
+    sigma = np.sqrt((f + 2) * (f * f + 2 * f + 3) / (18 * (f + 1) ** 2 * n_values * f))
+    z = norm.ppf(1 - alpha / 2)
+    return 100.0 * (mu - z * sigma), 100.0 * (mu + z * sigma)
+
+
+def summarize(values, n_values, alpha=0.05):
+    """
+    Distribución de NPCR/UACI de la campaña y fracción de pares que pasan
+    los valores críticos.
+    """
+    npcr_values, uaci_values = values[:, 0], values[:, 1]
+    n_star = npcr_critical(n_values, alpha)
+    u_low, u_high = uaci_interval(n_values, alpha)
+
+    def describe(v):
+        return {
+            "mean": float(v.mean()), "std": float(v.std()),
+            "min": float(v.min()), "max": float(v.max()),
+            "p5": float(np.percentile(v, 5)), "p50": float(np.percentile(v, 50)),
+            "p95": float(np.percentile(v, 95)),
+        }
+
+    return {
+        "pairs": len(values),
+        "npcr": describe(npcr_values),
+        "uaci": describe(uaci_values),
+        "npcr_critical": float(n_star),
+        "uaci_interval": (float(u_low), float(u_high)),
+        "npcr_pass_rate": float(np.mean(npcr_values >= n_star)),
+        "uaci_pass_rate": float(np.mean((uaci_values >= u_low) & (uaci_values <= u_high))),
+    }
+
+
+class DifferentialCampaign:
+    def __init__(self, scheme="aes-cfb", seed=0.1, warmup=1000, size=None,
+                 workers=None, batch_size=16, rng_seed=0):
+        if scheme not in SCHEMES:
+            raise ValueError(f"Esquema desconocido: {scheme} (opciones: {', '.join(SCHEMES)})")
+        self.scheme = scheme
+        self.seed = seed
+        self.warmup = warmup
+        self.size = size
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.rng_seed = rng_seed
+        self.n_values = None
+
+    def batches(self, path, frame_indices, positions_per_frame):
+        """
+        Lotes (esquema, estado, frame, posiciones) en orden de frame; el
+        cifrador avanza un paso por frame como en el cifrado real.
+        """
+        rng = np.random.default_rng(self.rng_seed)
+        encryptor = make_encryptor(self.scheme, self.seed, self.warmup)
+        position = 0
+        for index, frame in sample_frames(path, sorted(frame_indices), self.size):
+            encryptor.skip(index - position)
+            position = index
+            state = encryptor.get_state()
+            positions = sample_positions(frame.shape, positions_per_frame, rng)
+            for start in range(0, positions_per_frame, self.batch_size):
+                yield self.scheme, state, frame, positions[start:start + self.batch_size]
+
+    def run(self, path, frames=8, positions_per_frame=64, total_frames=None):
+        """
+        Valores (pares, 2) con NPCR y UACI (%) de `frames` frames
+        equiespaciados del video y `positions_per_frame` píxeles por frame.
+        """
+        if total_frames is None:
+            cap = cv2.VideoCapture(path)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+        if total_frames <= 0:
+            raise RuntimeError(f"No se pudieron leer frames de {path}")
+        indices = np.unique(np.linspace(0, total_frames - 1, min(frames, total_frames)).astype(int))
+
+        jobs = list(self.batches(path, indices, positions_per_frame))
+        if not jobs:
+            raise RuntimeError(f"No se pudieron leer frames de {path}")
+        if self.workers == 1:
+            parts = [differential_batch(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(self.workers) as pool:
+                parts = list(pool.map(differential_batch, *zip(*jobs)))
+        self.n_values = parts[0][1]
+        return np.concatenate([values for values, _ in parts])
+
+
+def run_campaign(path, scheme="aes-cfb", frames=8, positions_per_frame=64, alpha=0.05, **kwargs):
+    """
+    Resumen (ver summarize) de una campaña completa sobre el video.
+    """
+    campaign = DifferentialCampaign(scheme, **kwargs)
+    values = campaign.run(path, frames, positions_per_frame)
+    return summarize(values, campaign.n_values, alpha)
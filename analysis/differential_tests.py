@@ -5,18 +5,18 @@ Pruebas diferenciales NPCR y UACI
 
 import numpy as np
 
-def modify_one_pixel(frame):
+def modify_one_pixel(frame, position=None):
     """
     Modifica un solo píxel del frame (escenario diferencial).
-    Maneja correctamente uint8 sin overflow.
+    Maneja correctamente uint8 sin overflow. `position` es (fila, columna)
+    o (fila, columna, canal); por defecto el primer píxel/canal.
     """
-    import numpy as np
-
     modified = frame.copy()
-    x, y = 0, 0
+    if position is None:
+        position = (0,) * frame.ndim
 
-    value = int(modified[x, y])
-    modified[x, y] = np.uint8((value + 1) % 256)
+    value = int(modified[position])
+    modified[position] = np.uint8((value + 1) % 256)
 
     return modified
 
@@ -0,0 +1,221 @@
+"""
+frame_cache.py
+Caché en disco de frames decodificados
+
+Los frames decodificados de un video se guardan como un único .npy
+(N, alto, ancho[, 3]) y se devuelven como memmap de solo lectura, sin copia.
+La clave combina el hash del contenido del archivo con los parámetros de
+decodificación (gris/color, tamaño), así un video regenerado con el mismo
+nombre no reutiliza frames viejos. Cada video se guarda completo una sola
+vez y los rangos pedidos son cortes del memmap: los tramos del runner no
+crean entradas distintas según el número de workers. Con más de max_bytes
+en disco se eliminan las entradas usadas hace más tiempo (LRU).
+
+El índice (index.json) y cada decodificación se protegen con locks de
+archivo (fcntl en POSIX, msvcrt en Windows), porque varios procesos del
+runner de análisis pueden usar la caché a la vez.
+"""
+
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_NPY_HEADER_SIZE = 128  # fijo para poder reescribir el número de frames al final
+
+
+def _npy_header(shape):
+    header = repr({'descr': '|u1', 'fortran_order': False, 'shape': tuple(shape)})
+    prefix = np.lib.format.magic(1, 0)
+    header = header.ljust(_NPY_HEADER_SIZE - len(prefix) - 2 - 1) + '\n'
+    return prefix + len(header).to_bytes(2, 'little') + header.encode('latin1')
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def _file_lock(path):
+    # Lock exclusivo entre procesos sobre el archivo `path`
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK se rinde tras ~10 s: seguir esperando
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FrameCache:
+    def __init__(self, root="data/frame_cache", max_bytes=4 << 30):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        self.index_path = os.path.join(root, "index.json")
+
+    # -------- índice --------
+
+    @contextmanager
+    def _index(self):
+        with _file_lock(os.path.join(self.root, ".lock")):
+            index = {"entries": {}, "hashes": {}}
+            if os.path.exists(self.index_path):
+                with open(self.index_path) as f:
+                    index = json.load(f)
+            yield index
+            tmp = f"{self.index_path}.{os.getpid()}"
+            with open(tmp, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp, self.index_path)
+
+    def _content_hash(self, path):
+        # El hash completo solo se recalcula si cambia tamaño o mtime
+        st = os.stat(path)
+        stamp = f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+        with self._index() as index:
+            cached = index["hashes"].get(stamp)
+        if cached is None:
+            cached = file_hash(path)
+            with self._index() as index:
+                index["hashes"][stamp] = cached
+        return cached
+
+    def key(self, path, gray=True, size=None):
+        params = json.dumps([self._content_hash(path), gray, size and list(size)])
+        return hashlib.sha256(params.encode()).hexdigest()[:32]
+
+    # -------- acceso --------
+
+    def _open(self, entry):
+        return np.load(os.path.join(self.root, entry["file"]), mmap_mode='r')
+
+    def _lookup(self, key):
+        with self._index() as index:
+            entry = index["entries"].get(key)
+            if entry and os.path.exists(os.path.join(self.root, entry["file"])):
+                entry["last_used"] = time.time()
+                return self._open(entry)
+        return None
+
+    def get(self, path, gray=True, size=None, start=0, max_frames=None):
+        """
+        Frames [start, start + max_frames) (N, alto, ancho[, 3]) uint8 como
+        memmap de solo lectura, cortados de la entrada con el video completo;
+        decodifica y guarda el video si no estaba. Devuelve None si el video
+        no cabe en max_bytes (el llamador decodifica en streaming).
+        """
+        stop = None if max_frames is None else start + max_frames
+        key = self.key(path, gray, size)
+
+        frames = self._lookup(key)
+        if frames is None:
+            if self.estimate_bytes(path, gray, size) > self.max_bytes:
+                return None
+            # Un solo proceso decodifica cada video; los demás esperan y
+            # reutilizan su entrada
+            with _file_lock(os.path.join(self.root, f"{key}.lock")):
+                frames = self._lookup(key)
+                if frames is None:
+                    filename = self._decode(path, key, gray, size)
+                    nbytes = os.path.getsize(os.path.join(self.root, filename))
+                    with self._index() as index:
+                        index["entries"][key] = {
+                            "file": filename, "bytes": nbytes, "last_used": time.time(),
+                            "source": os.path.abspath(path), "gray": gray,
+                            "size": size and list(size),
+                        }
+                        self._evict(index, keep=key)
+                    frames = np.load(os.path.join(self.root, filename), mmap_mode='r')
+        return frames[start:stop]
+
+    def estimate_bytes(self, path, gray=True, size=None, start=0, max_frames=None):
+        cap = cv2.VideoCapture(path)
+        n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        if size is not None:
+            w, h = size
+        n = max(n - start, 0)
+        if max_frames is not None:
+            n = min(n, max_frames)
+        return n * w * h * (1 if gray else 3)
+
+    def _decode(self, path, key, gray, size):
+        filename = f"{key}.npy"
+        tmp = os.path.join(self.root, f"{key}.{os.getpid()}.tmp")
+
+        cap = cv2.VideoCapture(path)
+        shape = None
+        count = 0
+        with open(tmp, 'wb') as f:
+            f.write(_npy_header((0,)))
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if gray:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                if size is not None:
+                    frame = cv2.resize(frame, tuple(size))
+                shape = frame.shape
+                f.write(np.ascontiguousarray(frame).data)
+                count += 1
+            # Header definitivo con el número real de frames
+            f.seek(0)
+            f.write(_npy_header((count,) + (shape or (0,))))
+        cap.release()
+
+        os.replace(tmp, os.path.join(self.root, filename))
+        return filename
+
+    def _evict(self, index, keep=None):
+        entries = index["entries"]
+        total = sum(e["bytes"] for e in entries.values())
+        for k in sorted(entries, key=lambda k: entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if k == keep:
+                continue
+            entry = entries.pop(k)
+            total -= entry["bytes"]
+            try:
+                os.remove(os.path.join(self.root, entry["file"]))
+            except OSError:  # ya borrado, o mapeado por otro proceso en Windows
+                pass
+
+    def clear(self):
+        with self._index() as index:
+            index["entries"], entries = {}, index["entries"]
+            for entry in entries.values():
+                try:
+                    os.remove(os.path.join(self.root, entry["file"]))
+                except OSError:  # ya borrado, o mapeado por otro proceso en Windows
+                    pass
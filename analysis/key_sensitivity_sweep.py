@@ -0,0 +1,154 @@
+"""
+key_sensitivity_sweep.py
+Barrido de sensibilidad a la clave sobre el ciphertext real
+
+Cada perturbación suma un delta mínimo a un parámetro del generador caótico
+(semilla, dt, a, b, c, d, tau1-tau3). Todas las claves perturbadas, más la
+correcta en la sesión 0, avanzan juntas como un ChaosEnsemble (un paso
+vectorizado por frame); las claves de los frames muestreados se derivan
+como en SDKGenerator y los descifrados se reparten en lotes entre procesos.
+
+Por perturbación se reporta PSNR y SSIM contra el descifrado con la clave
+correcta y NPCR entre ambos descifrados. Un sistema sensible a la clave da
+PSNR ~9 dB, SSIM ~0 y NPCR ~99.6 % incluso con deltas de 1e-15.
+
+Trabaja sobre el ciphertext AES (RawCipherReader, modos cfb/ctr): con una
+clave incorrecta un registro MNAK no se puede deserializar.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from crypto.chaos_generator import ChaosKeyGenerator
+from crypto.chaos_ensemble import ChaosEnsemble
+from crypto.sdk_generator import digest_states
+from crypto.aes_encryptor import AESCFBFrameEncryptor, AESCTRFrameEncryptor
+from video.raw_sink import RawCipherReader
+from analysis.quality_tests import psnr
+from analysis.ssim_tests import SSIMEngine
+from analysis.differential_tests import npcr
+
+PARAMS = ("seed", "dt", "a", "b", "c", "d", "tau1", "tau2", "tau3")
+DELTAS = (1e-15, 1e-12, 1e-9, 1e-6)
+
+DECRYPTORS = {
+    "cfb": AESCFBFrameEncryptor,
+    "ctr": AESCTRFrameEncryptor,
+}
+
+
+def perturbations(params=PARAMS, deltas=DELTAS):
+    return [(param, delta) for param in params for delta in deltas]
+
+
+def _decryptor(mode):
+    if mode not in DECRYPTORS:
+        raise ValueError(f"Modo de cifrado no soportado: {mode} (opciones: {', '.join(DECRYPTORS)})")
+    if mode == "ctr":
+        return AESCTRFrameEncryptor(ChaosKeyGenerator(), workers=1)
+    return DECRYPTORS[mode](ChaosKeyGenerator())
+
+
+def perturbed_ensemble(seed=0.1, dt=0.01, items=()):
+    """
+    Sesión 0 con los parámetros de producción y una sesión por (parámetro,
+    delta). Devuelve el ensemble y el cambio realmente aplicado a cada
+    parámetro (0 si el delta se pierde por redondeo).
+    """
+    base = ChaosKeyGenerator(seed=seed, dt=dt)
+    values = {name: getattr(base, name) for name in PARAMS if name != "seed"}
+    values["seed"] = seed
+
+    columns = {name: np.full(len(items) + 1, value) for name, value in values.items()}
+    for s, (param, delta) in enumerate(items, start=1):
+        if param not in columns:
+            raise ValueError(f"Parámetro desconocido: {param} (opciones: {', '.join(PARAMS)})")
+        columns[param][s] += delta
+
+    applied = [float(columns[param][s] - values[param]) for s, (param, _) in enumerate(items, start=1)]
+    seeds = columns.pop("seed")
+    return ChaosEnsemble(seeds, **columns), applied
+
+
+def session_keys(ensemble, warmup, frame_indices):
+    """
+    {frame: [digest por sesión]} para los frames pedidos; el frame i usa el
+    paso i tras el warmup, como SDKGenerator.generate() en main.py.
+    """
+    ensemble.step_many(warmup)
+    wanted = set(int(i) for i in frame_indices)
+    keys = {}
+    for i in range(max(wanted) + 1):
+        states = ensemble.step()
+        if i in wanted:
+            keys[i] = digest_states(states)
+    return keys
+
+
+def decrypt_batch(mode, ciphertext, reference, digests):
+    """
+    (PSNR, SSIM, NPCR) de cada clave del lote frente al descifrado correcto.
+    """
+    decryptor = _decryptor(mode)
+    engine = SSIMEngine()
+    reference_f = reference.astype(np.float64)
+
+    values = np.empty((len(digests), 3))
+    for k, digest in enumerate(digests):
+        plain = decryptor.decrypt_prepared(digest[:16], digest[16:32], ciphertext)
+        values[k] = (psnr(reference_f, plain),
+                     float(engine.ssim(reference, plain, color=plain.ndim == 3)[0]),
+                     npcr(reference, plain))
+    return values
+
+
+def run_sweep(path, items=None, frames=8, seed=0.1, warmup=1000, dt=0.01,
+              workers=None, batch_size=32):
+    """
+    Barrido completo sobre `frames` frames equiespaciados del ciphertext en
+    `path`. Devuelve una fila por perturbación con las métricas promediadas
+    sobre los frames.
+    """
+    items = list(items or perturbations())
+    reader = RawCipherReader(path)
+    if len(reader) == 0:
+        raise RuntimeError(f"No hay frames cifrados en {path}")
+    indices = np.unique(np.linspace(0, len(reader) - 1, min(frames, len(reader))).astype(int))
+
+    ensemble, applied = perturbed_ensemble(seed, dt, items)
+    keys = session_keys(ensemble, warmup, indices)
+
+    decryptor = _decryptor(reader.mode)
+    jobs = []
+    for i in indices:
+        ciphertext = np.array(reader[i])
+        correct = keys[i][0]
+        reference = decryptor.decrypt_prepared(correct[:16], correct[16:32], ciphertext)
+        for start in range(1, len(items) + 1, batch_size):
+            jobs.append((reader.mode, ciphertext, reference, keys[i][start:start + batch_size]))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) == 1:
+        parts = [decrypt_batch(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            parts = list(pool.map(decrypt_batch, *zip(*jobs)))
+
+    # Lotes en orden (frame, sesión) -> (frames, perturbaciones, 3)
+    values = np.concatenate(parts).reshape(len(indices), len(items), 3)
+    rows = []
+    for s, (param, delta) in enumerate(items):
+        v = values[:, s]
+        rows.append({
+            "param": param,
+            "delta": delta,
+            "applied": applied[s],
+            "psnr": float(np.mean(v[:, 0])),
+            "ssim": float(np.mean(v[:, 1])),
+            "npcr": float(np.mean(v[:, 2])),
+            # Frames descifrados correctamente pese a la perturbación
+            "recovered": int(np.sum(np.isinf(v[:, 0]))),
+        })
+    return rows
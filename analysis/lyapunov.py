@@ -0,0 +1,281 @@
+"""
+lyapunov.py
+Espectro de Lyapunov y diagramas de bifurcación del sistema con retardos
+
+Versión en Python de chaos_analysis/modelo_3retardos.m para rejillas de
+parámetros (a, b, c, d, tau1-tau3). Se analiza el mapa que itera
+ChaosKeyGenerator (Euler con paso dt y retardos int(tau/dt)), que es el que
+produce las claves. Cada punto de la rejilla es una sesión de un
+ChaosEnsemble y todos avanzan con un paso vectorizado.
+
+El espectro se calcula con el método de Benettin (QR periódico) sobre el
+espacio tangente completo: cada vector tangente lleva sus propias líneas de
+retardo (Farmer, 1982), en lugar del jacobiano 4x4 del script de MATLAB,
+que ignora los términos retardados.
+
+Uso:
+    python -m analysis.lyapunov check [--steps N] [--transient N] [--expect RÉGIMEN]
+    python -m analysis.lyapunov grid --axis d 10 20 21 [--axis a 1.5 2.5 11] [--output FILE.npz]
+    python -m analysis.lyapunov bifurcation --axis d 10 20 200 [--variable x] [--output FILE.png]
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from crypto.chaos_generator import ChaosKeyGenerator
+from crypto.chaos_ensemble import ChaosEnsemble
+
+PARAMS = ("a", "b", "c", "d", "tau1", "tau2", "tau3")
+
+# Más allá de este valor la trayectoria se considera divergente (con Euler y
+# dt=0.01 el sistema desborda para d >~ 16.5)
+DIVERGENCE_BOUND = 1e6
+
+SPECTRUM_STEPS = 50_000
+REGIMES = ("hipercaótico", "caótico", "no caótico", "divergente")
+
+
+def parameter_grid(**axes):
+    """
+    Producto cartesiano de los ejes dados (nombre -> valores); el resto de
+    parámetros queda en su valor de producción. Devuelve (params, shape),
+    con un array plano por parámetro y la forma de la rejilla.
+    """
+    base = ChaosKeyGenerator()
+    for name in axes:
+        if name not in PARAMS:
+            raise ValueError(f"Parámetro desconocido: {name} (opciones: {', '.join(PARAMS)})")
+
+    names = list(axes)
+    mesh = np.meshgrid(*[np.asarray(axes[name], dtype=np.float64) for name in names], indexing="ij")
+    shape = mesh[0].shape if names else ()
+    size = int(np.prod(shape))
+
+    params = {name: np.full(size, getattr(base, name)) for name in PARAMS}
+    for name, values in zip(names, mesh):
+        params[name] = values.ravel()
+    return params, shape
+
+
+def _ensemble(params, seed, dt):
+    size = len(next(iter(params.values())))
+    return ChaosEnsemble(np.full(size, seed), dt=dt, **params)
+
+
+def _advance(ensemble, n):
+    for _ in range(n):
+        ensemble.step()
+
+
+def lyapunov_spectrum(params, k=4, steps=SPECTRUM_STEPS, transient=5_000, renorm=10,
+                      seed=0.1, dt=0.01, rng_seed=0):
+    """
+    Los k mayores exponentes de Lyapunov (por unidad de tiempo) de cada
+    punto, ordenados de mayor a menor: array (P, k), NaN si la trayectoria
+    diverge.
+    """
+    ensemble = _ensemble(params, seed, dt)
+    n = len(ensemble)
+    rows = np.arange(n)
+
+    with np.errstate(all="ignore"):
+        _advance(ensemble, transient)
+
+        # Vectores tangentes con el mismo layout de anillos que el ensemble;
+        # las posiciones de relleno de cada fila quedan en cero
+        rng = np.random.default_rng(rng_seed)
+        rings = []
+        for length, buf in ((ensemble.len1, ensemble.x_delay), (ensemble.len2, ensemble.y_delay),
+                            (ensemble.len3, ensemble.z_delay)):
+            valid = np.arange(buf.shape[1]) < length[:, np.newaxis]
+            rings.append(rng.standard_normal((n, k, buf.shape[1])) * valid[:, np.newaxis, :])
+        tx, ty, tz = rings
+        tw = rng.standard_normal((n, k))
+        widths = np.cumsum([tx.shape[2], ty.shape[2], tz.shape[2]])
+
+        def orthonormalize():
+            m = np.concatenate((tx, ty, tz, tw[:, :, np.newaxis]), axis=2)
+            bad = ~np.isfinite(m).all(axis=(1, 2))
+            m[bad] = 0.0
+            q, r = np.linalg.qr(np.swapaxes(m, 1, 2))
+            q = np.swapaxes(q, 1, 2)
+            tx[:], ty[:], tz[:] = q[:, :, :widths[0]], q[:, :, widths[0]:widths[1]], q[:, :, widths[1]:widths[2]]
+            tw[:] = q[:, :, -1]
+            return np.log(np.abs(np.diagonal(r, axis1=1, axis2=2))), bad
+
+        orthonormalize()
+
+        a, b, c = (p[:, np.newaxis] for p in (ensemble.a, ensemble.b, ensemble.c))
+        h = ensemble.dt[:, np.newaxis]
+        total = np.zeros((n, k))
+        diverged = np.zeros(n, dtype=bool)
+        blocks = steps // renorm
+
+        for _ in range(blocks):
+            for _ in range(renorm):
+                t = ensemble.t
+                i1, i2, i3 = t % ensemble.len1, t % ensemble.len2, t % ensemble.len3
+                c1, c2, c3 = (t - 1) % ensemble.len1, (t - 1) % ensemble.len2, (t - 1) % ensemble.len3
+                y = ensemble.y[:, np.newaxis]
+                z = ensemble.z[:, np.newaxis]
+
+                # Linealización del paso de Euler de ChaosKeyGenerator.step
+                dx, dy, dz, dw = tx[rows, :, c1], ty[rows, :, c2], tz[rows, :, c3], tw
+                nx = dx + h * (-a * tx[rows, :, i1] - b * z * dy - b * y * dz)
+                ny = dy + h * (-dx + c * ty[rows, :, i2] + c * dw)
+                nz = dz + h * (-2 * y * dy - tz[rows, :, i3])
+                nw = dw + h * (dx - dw)
+
+                tx[rows, :, i1] = nx
+                ty[rows, :, i2] = ny
+                tz[rows, :, i3] = nz
+                tw = nw
+                ensemble.step()
+
+            logs, bad = orthonormalize()
+            total += logs
+            diverged |= bad | ~(np.abs(ensemble.x) < DIVERGENCE_BOUND)
+
+    exponents = -np.sort(-total / (blocks * renorm * ensemble.dt[:, np.newaxis]), axis=1)
+    exponents[diverged] = np.nan
+    return exponents
+
+
+def bifurcation(params, variable="x", steps=20_000, transient=10_000, max_peaks=256,
+                seed=0.1, dt=0.01):
+    """
+    Máximos locales de `variable` tras el transitorio en cada punto: array
+    (P, max_peaks) con NaN de relleno (pocos valores distintos = órbita
+    periódica, una nube = caos). Los puntos divergentes quedan en NaN.
+    """
+    if variable not in "xyzw" or len(variable) != 1:
+        raise ValueError(f"Variable desconocida: {variable} (opciones: x, y, z, w)")
+    column = "xyzw".index(variable)
+    ensemble = _ensemble(params, seed, dt)
+    n = len(ensemble)
+
+    peaks = np.full((n, max_peaks), np.nan)
+    count = np.zeros(n, dtype=np.int64)
+    diverged = np.zeros(n, dtype=bool)
+    with np.errstate(all="ignore"):
+        _advance(ensemble, transient)
+        prev2 = prev1 = None
+        for _ in range(steps):
+            current = ensemble.step()[:, column]
+            diverged |= ~(np.abs(current) < DIVERGENCE_BOUND)
+            if prev2 is not None:
+                hit = np.nonzero((prev1 > prev2) & (prev1 >= current) & (count < max_peaks))[0]
+                peaks[hit, count[hit]] = prev1[hit]
+                count[hit] += 1
+            prev2, prev1 = prev1, current
+    peaks[diverged] = np.nan
+    return peaks
+
+
+def tolerance(steps, dt=0.01):
+    """
+    Umbral para contar un exponente como positivo tras `steps` pasos. El
+    exponente nulo del flujo converge como ~1/T (T = steps·dt): ~0.18 con
+    T=5, ~0.02 con T=20, ~6e-4 con T=500; con un umbral fijo una corrida
+    corta lo cuenta como segundo positivo (falso "hipercaótico"). Nunca
+    baja del 1e-3 de modelo_3retardos.m.
+    """
+    return max(1e-3, 2.0 / (steps * dt))
+
+
+def regime(exponents, tol=None, steps=SPECTRUM_STEPS, dt=0.01):
+    """
+    Clasificación de cada punto como en modelo_3retardos.m según el número
+    de exponentes positivos (> tol; por defecto tolerance(steps, dt)).
+    """
+    if tol is None:
+        tol = tolerance(steps, dt)
+    labels = []
+    for row in np.atleast_2d(exponents):
+        if np.isnan(row).any():
+            labels.append("divergente")
+            continue
+        positive = int(np.sum(row > tol))
+        labels.append("hipercaótico" if positive >= 2 else "caótico" if positive == 1 else "no caótico")
+    return labels
+
+
+def _axes(specs):
+    return {name: np.linspace(float(start), float(stop), int(num)) for name, start, stop, num in specs}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    check = sub.add_parser("check", help="espectro con los parámetros de producción "
+                                         "(código 1 si la clasificación no es la esperada)")
+    # Con los parámetros de producción lambda_2 converge a ~6e-4: el
+    # sistema es caótico (un solo exponente positivo), no hipercaótico
+    check.add_argument("--expect", default="caótico", choices=REGIMES,
+                       help="clasificación esperada (por defecto la de producción: caótico)")
+    grid = sub.add_parser("grid", help="espectro sobre una rejilla de parámetros")
+    grid.add_argument("--output", default="data/lyapunov_grid.npz")
+    bif = sub.add_parser("bifurcation", help="diagrama de bifurcación sobre un parámetro")
+    bif.add_argument("--variable", default="x", choices=list("xyzw"))
+    bif.add_argument("--output", default="results/plots/bifurcation.png")
+
+    for p in (grid, bif):
+        p.add_argument("--axis", nargs=4, action="append", required=True,
+                       metavar=("PARAM", "INICIO", "FIN", "PUNTOS"))
+    for p in (check, grid):
+        p.add_argument("--exponents", type=int, default=4)
+    for p in (check, grid, bif):
+        p.add_argument("--steps", type=int, default=None)
+        p.add_argument("--transient", type=int, default=None)
+        p.add_argument("--seed", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    options = {"seed": args.seed}
+    if args.steps is not None:
+        options["steps"] = args.steps
+    if args.transient is not None:
+        options["transient"] = args.transient
+
+    steps = options.get("steps", SPECTRUM_STEPS)
+    if args.command == "check":
+        params, _ = parameter_grid()
+        exponents = lyapunov_spectrum(params, args.exponents, **options)[0]
+        for i, value in enumerate(exponents, start=1):
+            print(f"  lambda_{i} = {value:+9.6f}")
+        label = regime(exponents, steps=steps)[0]
+        print(f"Suma: {np.sum(exponents):+.6f} | Sistema {label.upper()} "
+              f"(tolerancia {tolerance(steps):.1e})")
+        if label != args.expect:
+            print(f"Se esperaba: {args.expect}")
+            return 1
+        return 0
+
+    axes = _axes(args.axis)
+    params, shape = parameter_grid(**axes)
+
+    if args.command == "grid":
+        exponents = lyapunov_spectrum(params, args.exponents, **options)
+        labels = regime(exponents, steps=steps)
+        for label in REGIMES:
+            print(f"{label:<13} {labels.count(label):>6} de {len(labels)} puntos")
+        np.savez(args.output, exponents=exponents.reshape(shape + (args.exponents,)),
+                 **{f"axis_{name}": values for name, values in axes.items()})
+        print(f"Resultados guardados en {args.output}")
+        return 0
+
+    if len(axes) != 1:
+        parser.error("bifurcation requiere un único --axis")
+    from reporting.plots import save_bifurcation_plot
+
+    (name, values), = axes.items()
+    peaks = bifurcation(params, args.variable, **options)
+    save_bifurcation_plot(values, peaks, name, args.variable, args.output)
+    print(f"Diagrama guardado en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,11 @@ nist_tests.py
 Pruebas básicas de aleatoriedad tipo NIST (offline)
 """
 
+from math import erfc, log, sqrt
+
 import numpy as np
+from scipy.special import gammaincc
+from scipy.stats import binom, norm
 
 def monobit_test(data):
     bits = np.unpackbits(data.astype(np.uint8))
@@ -17,3 +21,395 @@ def block_frequency_test(data, block_size=128):
     blocks = bits[:n_blocks * block_size].reshape(n_blocks, block_size)
     proportions = np.mean(blocks, axis=1)
     return float(np.mean(np.abs(proportions - 0.5)))
+
+
+# =========================
+# BATERÍA NIST SP 800-22 CON P-VALUES
+# =========================
+# Cada prueba recibe una secuencia de bits (uint8 0/1) y devuelve su
+# p-value (o una lista de p-values); la secuencia pasa con p >= ALPHA.
+
+ALPHA = 0.01
+
+# Uniformidad de los p-values (SP 800-22, 4.2.2): se exige p >= 1e-4 y solo
+# tiene sentido con al menos 55 p-values
+UNIFORMITY_ALPHA = 1e-4
+UNIFORMITY_MIN_PVALUES = 55
+
+
+def to_bits(data):
+    # bytes / memoryview / array -> bits 0/1 (MSB primero)
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+
+def _windows(bits, m):
+    """
+    Valor entero de la ventana de m bits que empieza en cada posición, con la
+    secuencia extendida circularmente (m - 1 bits del inicio al final).
+    """
+    n = len(bits)
+    ext = np.concatenate([bits, bits[:m - 1]]).astype(np.uint32)
+    values = np.zeros(n, dtype=np.uint32)
+    for j in range(m):
+        values <<= 1
+        values |= ext[j:j + n]
+    return values
+
+
+def _block_windows(blocks, m):
+    # Ventanas de m bits completamente dentro de cada fila (sin extensión)
+    width = blocks.shape[1] - m + 1
+    values = np.zeros((blocks.shape[0], width), dtype=np.uint32)
+    for j in range(m):
+        values <<= 1
+        values |= blocks[:, j:j + width]
+    return values
+
+
+def frequency_pvalue(bits):
+    n = len(bits)
+    s = 2 * int(bits.sum()) - n
+    return erfc(abs(s) / sqrt(n) / sqrt(2))
+
+
+def block_frequency_pvalue(bits, block_size=None):
+    # SP 800-22 2.2.7: M >= 20, M > 0.01 n y menos de 100 bloques
+    if block_size is None:
+        block_size = max(20, -(-len(bits) // 99))
+    n_blocks = len(bits) // block_size
+    blocks = bits[:n_blocks * block_size].reshape(n_blocks, block_size)
+    pi = blocks.mean(axis=1)
+    chi2 = 4 * block_size * np.sum((pi - 0.5) ** 2)
+    return float(gammaincc(n_blocks / 2, chi2 / 2))
+
+
+def runs_pvalue(bits):
+    n = len(bits)
+    pi = bits.mean()
+    if abs(pi - 0.5) >= 2 / sqrt(n):
+        return 0.0
+    v = 1 + int(np.count_nonzero(bits[1:] != bits[:-1]))
+    return erfc(abs(v - 2 * n * pi * (1 - pi)) / (2 * sqrt(2 * n) * pi * (1 - pi)))
+
+
+# (M, clases de la racha más larga, probabilidades) según la longitud n
+_LONGEST_RUN = (
+    (6272, 8, (1, 2, 3, 4), (0.2148, 0.3672, 0.2305, 0.1875)),
+    (750000, 128, (4, 5, 6, 7, 8, 9), (0.1174, 0.2430, 0.2493, 0.1752, 0.1027, 0.1124)),
+    (None, 10000, (10, 11, 12, 13, 14, 15, 16),
+     (0.0882, 0.2092, 0.2483, 0.1933, 0.1208, 0.0675, 0.0727)),
+)
+
+
+def longest_run_pvalue(bits):
+    n = len(bits)
+    for limit, M, classes, pi in _LONGEST_RUN:
+        if limit is None or n < limit:
+            break
+    n_blocks = n // M
+
+    # Racha más larga de unos por bloque: distancia máxima entre ceros
+    # consecutivos, con un cero de relleno a cada lado del bloque
+    padded = np.zeros((n_blocks, M + 2), dtype=np.uint8)
+    padded[:, 1:-1] = bits[:n_blocks * M].reshape(n_blocks, M)
+    zeros = np.flatnonzero(padded.ravel() == 0)
+    gaps = np.diff(zeros) - 1
+    longest = np.zeros(n_blocks, dtype=np.int64)
+    np.maximum.at(longest, zeros[:-1] // (M + 2), gaps)
+
+    counts = np.bincount(np.clip(longest, classes[0], classes[-1]) - classes[0],
+                         minlength=len(classes))
+    expected = n_blocks * np.array(pi)
+    chi2 = np.sum((counts - expected) ** 2 / expected)
+    return float(gammaincc((len(classes) - 1) / 2, chi2 / 2))
+
+
+def dft_pvalue(bits):
+    n = len(bits)
+    x = 2.0 * bits - 1.0
+    modulus = np.abs(np.fft.rfft(x)[:n // 2])
+    threshold = sqrt(log(1 / 0.05) * n)
+    n0 = 0.95 * n / 2
+    n1 = np.count_nonzero(modulus < threshold)
+    d = (n1 - n0) / sqrt(n * 0.95 * 0.05 / 4)
+    return erfc(abs(d) / sqrt(2))
+
+
+def aperiodic_templates(m):
+    # Plantillas de m bits que no se solapan consigo mismas
+    templates = []
+    for value in range(1 << m):
+        b = [(value >> (m - 1 - i)) & 1 for i in range(m)]
+        if all(b[k:] != b[:m - k] for k in range(1, m)):
+            templates.append(value)
+    return templates
+
+
+def non_overlapping_template_pvalues(bits, m=9, n_blocks=8, templates=None):
+    """
+    Un p-value por plantilla aperiódica. Como una plantilla aperiódica no se
+    solapa consigo misma, contar sin solapamiento equivale a contar todas
+    las coincidencias, y todas las plantillas salen de un solo bincount.
+    """
+    templates = aperiodic_templates(m) if templates is None else templates
+    M = len(bits) // n_blocks
+    blocks = bits[:n_blocks * M].reshape(n_blocks, M)
+
+    windows = _block_windows(blocks, m)
+    rows = np.arange(n_blocks, dtype=np.int64)[:, None] << m
+    counts = np.bincount((rows + windows).ravel(),
+                         minlength=n_blocks << m).reshape(n_blocks, 1 << m)
+
+    W = counts[:, templates]
+    mu = (M - m + 1) / 2 ** m
+    sigma2 = M * (1 / 2 ** m - (2 * m - 1) / 2 ** (2 * m))
+    chi2 = np.sum((W - mu) ** 2, axis=0) / sigma2
+    return [float(p) for p in gammaincc(n_blocks / 2, chi2 / 2)]
+
+
+# Probabilidades de 0..4 y >= 5 coincidencias (m = 9, M = 1032; SP 800-22 rev1a)
+_OVERLAPPING_PI = (0.364091, 0.185659, 0.139381, 0.100571, 0.070432, 0.139865)
+
+
+def overlapping_template_pvalue(bits, m=9, block_size=1032):
+    n_blocks = len(bits) // block_size
+    template = (1 << m) - 1  # m unos
+    blocks = bits[:n_blocks * block_size].reshape(n_blocks, block_size)
+    hits = np.count_nonzero(_block_windows(blocks, m) == template, axis=1)
+
+    counts = np.bincount(np.minimum(hits, 5), minlength=6)
+    expected = n_blocks * np.array(_OVERLAPPING_PI)
+    chi2 = np.sum((counts - expected) ** 2 / expected)
+    return float(gammaincc(5 / 2, chi2 / 2))
+
+
+def _pattern_counts(bits, m):
+    """
+    Frecuencias circulares de los patrones de m, m-1, m-2... bits: la
+    ventana de k < m bits es la de m bits desplazada m - k a la derecha.
+    """
+    windows = _windows(bits, m)
+    counts = np.bincount(windows, minlength=1 << m)
+    levels = [counts]
+    for _ in range(m - 1):
+        counts = counts.reshape(-1, 2).sum(axis=1)
+        levels.append(counts)
+    return levels  # levels[i] -> patrones de m - i bits
+
+
+def serial_pvalues(bits, m=16):
+    n = len(bits)
+    levels = _pattern_counts(bits, m)
+
+    def psi2(i):
+        if m - i <= 0:
+            return 0.0
+        counts = levels[i]
+        return (1 << (m - i)) / n * float(np.dot(counts, counts)) - n
+
+    psi_m, psi_m1, psi_m2 = psi2(0), psi2(1), psi2(2)
+    d1 = psi_m - psi_m1
+    d2 = psi_m - 2 * psi_m1 + psi_m2
+    return [float(gammaincc(2 ** (m - 2), d1 / 2)), float(gammaincc(2 ** (m - 3), d2 / 2))]
+
+
+def approximate_entropy_pvalue(bits, m=10):
+    n = len(bits)
+    levels = _pattern_counts(bits, m + 1)
+
+    def phi(counts):
+        p = counts[counts > 0] / n
+        return float(np.sum(p * np.log(p)))
+
+    apen = phi(levels[1]) - phi(levels[0])
+    chi2 = 2 * n * (log(2) - apen)
+    return float(gammaincc(2 ** (m - 1), chi2 / 2))
+
+
+def _cusum_pvalue(n, z):
+    k = np.arange(int((-n / z + 1) / 4), int((n / z - 1) / 4) + 1)
+    s1 = np.sum(norm.cdf((4 * k + 1) * z / sqrt(n)) - norm.cdf((4 * k - 1) * z / sqrt(n)))
+    k = np.arange(int((-n / z - 3) / 4), int((n / z - 1) / 4) + 1)
+    s2 = np.sum(norm.cdf((4 * k + 3) * z / sqrt(n)) - norm.cdf((4 * k + 1) * z / sqrt(n)))
+    return float(1 - s1 + s2)
+
+
+def cumulative_sums_pvalues(bits):
+    # Modo hacia adelante y hacia atrás
+    x = 2 * bits.astype(np.int64) - 1
+    n = len(bits)
+    forward = np.cumsum(x)
+    z_forward = int(np.max(np.abs(forward)))
+    # Sumas parciales desde el final: total - prefijo anterior
+    backward = forward[-1] - np.concatenate([[0], forward[:-1]])
+    z_backward = int(np.max(np.abs(backward)))
+    return [_cusum_pvalue(n, z_forward), _cusum_pvalue(n, z_backward)]
+
+
+NIST_TESTS = {
+    "Frequency": frequency_pvalue,
+    "BlockFrequency": block_frequency_pvalue,
+    "Runs": runs_pvalue,
+    "LongestRun": longest_run_pvalue,
+    "FFT": dft_pvalue,
+    "NonOverlappingTemplate": non_overlapping_template_pvalues,
+    "OverlappingTemplate": overlapping_template_pvalue,
+    "Serial": serial_pvalues,
+    "ApproximateEntropy": approximate_entropy_pvalue,
+    "CumulativeSums": cumulative_sums_pvalues,
+}
+
+
+def run_battery(bits):
+    """
+    p-values de todas las pruebas sobre una secuencia de bits.
+    """
+    results = {}
+    for name, test in NIST_TESTS.items():
+        p = test(bits)
+        results[name] = p if isinstance(p, list) else [p]
+    return results
+
+
+# =========================
+# BATERÍA EN STREAMING
+# =========================
+
+def iter_ciphertext(path, max_bytes=None):
+    """
+    Ciphertext como bloques de bytes, registro a registro, de un contenedor
+    MNAK (.mnak) o de un stream crudo (.raw).
+    """
+    from video.mnak_container import MNAKContainerReader
+    from video.raw_sink import RawCipherReader
+
+    reader = RawCipherReader(path) if path.endswith(".raw") else MNAKContainerReader(path)
+    remaining = max_bytes
+    try:
+        for i in range(len(reader)):
+            # Copia: ninguna vista debe sobrevivir al cierre del mmap
+            with memoryview(reader[i]) as view:
+                data = view.cast('B')[:remaining].tobytes()
+            if remaining is not None:
+                remaining -= len(data)
+            yield data
+            if remaining == 0:
+                break
+    finally:
+        if hasattr(reader, "close"):
+            reader.close()
+
+
+def _uniformity_pvalue(pvalues):
+    # Uniformidad de los p-values en 10 intervalos (SP 800-22, 4.2.2)
+    counts, _ = np.histogram(pvalues, bins=10, range=(0, 1))
+    expected = len(pvalues) / 10
+    chi2 = np.sum((counts - expected) ** 2 / expected)
+    return float(gammaincc(9 / 2, chi2 / 2))
+
+
+class NISTStream:
+    """
+    Batería completa sobre un flujo de ciphertext: los bytes se acumulan en
+    secuencias de `sequence_bits` bits y cada secuencia completa se evalúa
+    (en un pool de procesos si workers > 1). La memoria depende del tamaño
+    de secuencia y de los workers, no del volumen total analizado.
+    """
+
+    def __init__(self, sequence_bits=1_000_000, workers=1):
+        if sequence_bits % 8:
+            raise ValueError("sequence_bits debe ser múltiplo de 8")
+        self.sequence_bytes = sequence_bits // 8
+        self.workers = workers
+        self.buffer = bytearray()
+        self.pvalues = {name: [] for name in NIST_TESTS}
+        self.sequences = 0
+        self.pool = None
+        self.inflight = []
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(workers)
+
+    def _collect(self, results):
+        # Una fila de p-values por secuencia (una columna por subprueba)
+        for name, values in results.items():
+            self.pvalues[name].append(values)
+        self.sequences += 1
+
+    def _submit(self, sequence):
+        bits = to_bits(sequence)
+        if self.pool is None:
+            self._collect(run_battery(bits))
+            return
+        self.inflight.append(self.pool.submit(run_battery, bits))
+        # Acotar las secuencias en vuelo
+        while len(self.inflight) > 2 * self.workers:
+            self._collect(self.inflight.pop(0).result())
+
+    def feed(self, data):
+        self.buffer += data
+        n = len(self.buffer) // self.sequence_bytes
+        for i in range(n):
+            start = i * self.sequence_bytes
+            self._submit(bytes(self.buffer[start:start + self.sequence_bytes]))
+        del self.buffer[:n * self.sequence_bytes]
+
+    def consume(self, chunks):
+        for chunk in chunks:
+            self.feed(chunk)
+        return self.finish()
+
+    def finish(self):
+        # Los bytes que no completan una secuencia se descartan
+        for future in self.inflight:
+            self._collect(future.result())
+        self.inflight = []
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        return self.summary()
+
+    def summary(self):
+        """
+        Por prueba: proporción de secuencias con p >= ALPHA, proporción
+        mínima aceptable (p̂ - 3·sqrt(p̂(1-p̂)/s), s = secuencias) y
+        uniformidad de p-values (NaN con menos de UNIFORMITY_MIN_PVALUES
+        secuencias), evaluadas por separado en cada subprueba (plantilla,
+        dirección, ...) como en SP 800-22 4.2: las subpruebas salen de los
+        mismos bits y no son independientes. Se reporta la peor subprueba;
+        la prueba pasa si pasan todas. "expected_failures" es el número de
+        subpruebas que fallarían por azar con datos ideales (con 148
+        plantillas, ~1.7 para 134 secuencias).
+        """
+        p_hat = 1 - ALPHA
+        results = {}
+        for name, values in self.pvalues.items():
+            if not values:
+                continue
+            values = np.array(values)  # (secuencias, subpruebas)
+            s, k = values.shape
+            proportions = np.mean(values >= ALPHA, axis=0)
+            minimum = p_hat - 3 * sqrt(p_hat * ALPHA / s)
+            if s >= UNIFORMITY_MIN_PVALUES:
+                uniformity = np.array([_uniformity_pvalue(column) for column in values.T])
+            else:
+                uniformity = np.full(k, np.nan)
+            failed = (proportions < minimum) | (uniformity < UNIFORMITY_ALPHA)
+            # P(fallo) de una subprueba con datos ideales: más de los fallos
+            # que admite la proporción mínima, o uniformidad por debajo
+            allowed = int(np.floor(s * (1 - minimum) + 1e-9))
+            false_failure = binom.sf(allowed, s, ALPHA)
+            if s >= UNIFORMITY_MIN_PVALUES:
+                false_failure += UNIFORMITY_ALPHA
+            results[name] = {
+                "pvalues": values.size,
+                "sequences": s,
+                "subtests": k,
+                "failed_subtests": int(failed.sum()),
+                "expected_failures": float(k * false_failure),
+                "proportion": float(proportions.min()),
+                "min_proportion": minimum,
+                "uniformity_p": float(uniformity.min()),
+                "passed": not failed.any(),
+            }
+        return results
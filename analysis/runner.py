@@ -0,0 +1,149 @@
+"""
+runner.py
+Ejecución paralela de métricas con entradas declaradas
+
+Cada nodo declara de qué entradas depende; los nodos cuyas dependencias ya
+están resueltas se envían a un pool de procesos y el resultado de cada
+métrica se guarda en results[sección][nombre], en el orden de declaración,
+con la misma forma que consume generate_pdf_report.
+
+    runner = MetricRunner()
+    runner.video("enc", "data/encrypted_video.mp4")
+    runner.metric("Pruebas NIST", "Monobit Test", monobit_test, "f_enc")
+    results = runner.run()
+
+Las funciones que corren en el pool deben ser de nivel de módulo (se
+envían por pickle); con local=True el nodo corre en el proceso principal y
+puede ser cualquier callable (útil para extraer valores baratos).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from analysis.video_loader import iter_video, frame_count
+from analysis.streaming_stats import VideoStatistics, DIRECTIONS
+
+
+def video_statistics(path, start=0, max_frames=None, directions=DIRECTIONS, cache=None):
+    # Estadísticas de un tramo [start, start + max_frames) del video
+    return VideoStatistics(directions).consume(iter_video(path, max_frames, start, cache))
+
+
+def merge_statistics(*parts):
+    stats = parts[0]
+    for part in parts[1:]:
+        stats.merge(part)
+    return stats
+
+
+class _Node:
+    __slots__ = ("key", "fn", "deps", "kwargs", "local")
+
+    def __init__(self, key, fn, deps, kwargs, local):
+        self.key = key
+        self.fn = fn
+        self.deps = deps
+        self.kwargs = kwargs
+        self.local = local
+
+
+class MetricRunner:
+    def __init__(self, workers=None, min_chunk_frames=32):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_chunk_frames = min_chunk_frames
+        self.nodes = {}
+        self.results = {}
+
+    def _add(self, key, fn, deps, kwargs, local):
+        if key in self.nodes:
+            raise ValueError(f"Nodo duplicado: {key}")
+        self.nodes[key] = _Node(key, fn, deps, kwargs, local)
+
+    def input(self, name, fn, *deps, local=False, **kwargs):
+        """
+        Entrada derivada (frame de referencia, estadísticas...) que otras
+        métricas pueden declarar por nombre.
+        """
+        self._add(name, fn, deps, kwargs, local)
+
+    def value(self, name, value):
+        self._add(name, lambda: value, (), {}, True)
+
+    def metric(self, section, name, fn, *deps, local=False, **kwargs):
+        # El orden de declaración fija el orden de secciones y métricas
+        self.results.setdefault(section, {})[name] = None
+        self._add((section, name), fn, deps, kwargs, local)
+
+    def task(self, name, fn, *deps, local=False, **kwargs):
+        # Trabajo sin resultado en el informe (p. ej. gráficos)
+        self._add(("task", name), fn, deps, kwargs, local)
+
+    def video(self, name, path, directions=DIRECTIONS, cache=None):
+        """
+        Estadísticas en streaming de un video completo; los tramos de frames
+        se reparten entre los workers y se unen en el proceso principal.
+        Con `cache` (FrameCache) cada tramo decodificado se reutiliza en
+        ejecuciones posteriores.
+        """
+        n = frame_count(path)
+        chunks = max(1, min(self.workers, n // self.min_chunk_frames))
+        if n <= 0 or chunks == 1:
+            self.input(name, video_statistics, path=path, directions=directions, cache=cache)
+            return
+
+        bounds = [n * i // chunks for i in range(chunks + 1)]
+        parts = []
+        for i in range(chunks):
+            part = f"{name}[{i}]"
+            # El último tramo lee hasta el final por si el conteo es inexacto
+            length = bounds[i + 1] - bounds[i] if i < chunks - 1 else None
+            self.input(part, video_statistics, path=path, start=bounds[i],
+                       max_frames=length, directions=directions, cache=cache)
+            parts.append(part)
+        self.input(name, merge_statistics, *parts, local=True)
+
+    def run(self):
+        for node in self.nodes.values():
+            for dep in node.deps:
+                if dep not in self.nodes:
+                    raise ValueError(f"Entrada no declarada: {dep} (requerida por {node.key})")
+
+        values = {}
+        pending = dict(self.nodes)
+        running = {}
+
+        def ready():
+            nodes = [n for n in pending.values() if all(d in values for d in n.deps)]
+            if pending and not nodes and not running:
+                raise ValueError(f"Dependencias cíclicas entre: {list(pending)}")
+            return nodes
+
+        def call(node):
+            return node.fn(*(values[d] for d in node.deps), **node.kwargs)
+
+        if self.workers == 1:
+            while pending:
+                for node in ready():
+                    values[node.key] = call(node)
+                    del pending[node.key]
+        else:
+            with ProcessPoolExecutor(self.workers) as pool:
+                while pending or running:
+                    for node in ready():
+                        del pending[node.key]
+                        if node.local:
+                            values[node.key] = call(node)
+                        else:
+                            args = [values[d] for d in node.deps]
+                            running[pool.submit(node.fn, *args, **node.kwargs)] = node.key
+                    if not running:
+                        continue
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        values[running.pop(future)] = future.result()
+
+        results = {section: dict(metrics) for section, metrics in self.results.items()}
+        for section, metrics in results.items():
+            for name in metrics:
+                metrics[name] = values[(section, name)]
+        return results
@@ -1,4 +1,5 @@
 # analysis/ssim_tests.py
+import cv2
 import numpy as np
 from scipy.ndimage import gaussian_filter
 
@@ -21,3 +22,154 @@ def ssim(img1, img2):
                 (sigma1 + sigma2 + C2))
 
     return float(np.mean(ssim_map))
+
+
+# Pesos de Wang et al. (2003) para MS-SSIM con 5 escalas
+MS_SSIM_WEIGHTS = (0.0448, 0.2856, 0.3001, 0.2363, 0.1333)
+
+
+class SSIMEngine:
+    """
+    SSIM por lotes de frames en float32 con los mismos parámetros que ssim()
+    (gaussiana sigma=1.5, C1/C2 para rango 255). Recibe pilas (N, H, W) o,
+    con color=True, (N, H, W, C) y devuelve un valor por frame (o por frame y
+    canal). El filtro gaussiano es separable (cv2.sepFilter2D, mismo núcleo
+    y borde 'reflect' que gaussian_filter) y se aplica frame a frame; los
+    buffers de trabajo se reutilizan entre llamadas del mismo tamaño.
+    """
+
+    def __init__(self, sigma=1.5, data_range=255.0, truncate=4.0):
+        self.sigma = sigma
+        self.C1 = (0.01 * data_range) ** 2
+        self.C2 = (0.03 * data_range) ** 2
+        radius = int(truncate * sigma + 0.5)
+        kernel = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+        self.kernel = (kernel / kernel.sum()).astype(np.float32)
+        self._workspaces = {}
+
+    def _workspace(self, shape):
+        ws = self._workspaces.get(shape)
+        if ws is None:
+            ws = tuple(np.empty(shape, dtype=np.float32) for _ in range(7))
+            self._workspaces[shape] = ws
+        return ws
+
+    def _stack(self, img, color):
+        img = np.asarray(img)
+        if img.ndim == (3 if color else 2):
+            img = img[np.newaxis]
+        if img.ndim != (4 if color else 3):
+            raise ValueError(f"Se esperaba una pila de frames, forma {img.shape}")
+        return img
+
+    def _ssim_cs(self, a, b):
+        """
+        Medias por frame (y canal) de SSIM y del término contraste-estructura.
+        """
+        x, y, mu1, mu2, t1, t2, t3 = self._workspace(a.shape)
+        axes = (1, 2)
+
+        def blur(src, out):
+            for i in range(len(src)):
+                cv2.sepFilter2D(src[i], -1, self.kernel, self.kernel, dst=out[i],
+                                borderType=cv2.BORDER_REFLECT)
+
+        x[...] = a
+        y[...] = b
+        blur(x, mu1)
+        blur(y, mu2)
+        np.multiply(x, x, out=t3)
+        blur(t3, t1)                     # E[x²]
+        np.multiply(y, y, out=t3)
+        blur(t3, t2)                     # E[y²]
+        np.multiply(x, y, out=x)
+        blur(x, t3)                      # E[xy]
+
+        np.multiply(mu1, mu2, out=y)     # mu1·mu2
+        t3 -= y                          # sigma12
+        np.square(mu1, out=mu1)
+        np.square(mu2, out=mu2)
+        t1 -= mu1                        # sigma1
+        t2 -= mu2                        # sigma2
+
+        # cs = (2·sigma12 + C2) / (sigma1 + sigma2 + C2)
+        t3 *= 2
+        t3 += self.C2
+        t1 += t2
+        t1 += self.C2
+        t3 /= t1
+
+        # l = (2·mu1·mu2 + C1) / (mu1² + mu2² + C1)
+        y *= 2
+        y += self.C1
+        mu1 += mu2
+        mu1 += self.C1
+        y /= mu1
+
+        cs = t3.mean(axis=axes, dtype=np.float64)
+        y *= t3
+        return y.mean(axis=axes, dtype=np.float64), cs
+
+    def ssim(self, a, b, color=False, per_channel=False):
+        a = self._stack(a, color)
+        b = self._stack(b, color)
+        if a.shape != b.shape:
+            raise ValueError("SSIM requiere imágenes del mismo tamaño")
+        values, _ = self._ssim_cs(a, b)
+        if color and not per_channel:
+            values = values.mean(axis=-1)
+        return values
+
+    def ms_ssim(self, a, b, color=False, weights=MS_SSIM_WEIGHTS):
+        """
+        SSIM multiescala: contraste-estructura en cada escala (reduciendo
+        2×2 entre escalas) y luminancia solo en la más gruesa.
+        """
+        a = self._stack(a, color).astype(np.float32)
+        b = self._stack(b, color).astype(np.float32)
+        if a.shape != b.shape:
+            raise ValueError("MS-SSIM requiere imágenes del mismo tamaño")
+
+        result = np.ones(a.shape[:1] + a.shape[3:], dtype=np.float64)
+        for level, weight in enumerate(weights):
+            ssim_value, cs = self._ssim_cs(a, b)
+            if level == len(weights) - 1:
+                result *= np.maximum(ssim_value, 0) ** weight
+            else:
+                result *= np.maximum(cs, 0) ** weight
+                h, w = a.shape[1] // 2 * 2, a.shape[2] // 2 * 2
+                a = (a[:, 0:h:2, 0:w:2] + a[:, 1:h:2, 0:w:2] +
+                     a[:, 0:h:2, 1:w:2] + a[:, 1:h:2, 1:w:2]) * 0.25
+                b = (b[:, 0:h:2, 0:w:2] + b[:, 1:h:2, 0:w:2] +
+                     b[:, 0:h:2, 1:w:2] + b[:, 1:h:2, 1:w:2]) * 0.25
+
+        if color:
+            result = result.mean(axis=-1)
+        return result
+
+
+def ssim_video(pairs, batch_size=4, color=False, multiscale=False, engine=None):
+    """
+    SSIM (o MS-SSIM) de cada par de frames (p. ej. zip de dos generadores),
+    por lotes; la memoria depende de batch_size, no de la duración del video.
+    """
+    engine = engine or SSIMEngine()
+    measure = engine.ms_ssim if multiscale else engine.ssim
+    values = []
+    batch_a = batch_b = None
+    n = 0
+
+    for fa, fb in pairs:
+        if batch_a is None:
+            batch_a = np.empty((batch_size,) + fa.shape, dtype=fa.dtype)
+            batch_b = np.empty((batch_size,) + fb.shape, dtype=fb.dtype)
+        batch_a[n] = fa
+        batch_b[n] = fb
+        n += 1
+        if n == batch_size:
+            values.append(measure(batch_a, batch_b, color=color))
+            n = 0
+
+    if n:
+        values.append(measure(batch_a[:n], batch_b[:n], color=color))
+    return np.concatenate(values) if values else np.empty(0)
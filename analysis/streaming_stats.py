@@ -0,0 +1,183 @@
+"""
+streaming_stats.py
+Acumuladores de una sola pasada para analizar videos completos con memoria
+acotada: histogramas de 256 bins (bincount), sumas para la correlación de
+Pearson en las tres direcciones y NPCR/UACI entre frames consecutivos.
+
+Los frames llegan de un generador (p. ej. analysis.video_loader.iter_video);
+solo se conserva el primer frame y el anterior.
+"""
+
+import time
+import numpy as np
+from scipy.stats import entropy
+
+DIRECTIONS = ("horizontal", "vertical", "diagonal")
+
+
+def _pairs(frame, mode):
+    # Mismos pares de píxeles que statistical_tests.correlation
+    if mode == "horizontal":
+        return frame[:, :-1], frame[:, 1:]
+    if mode == "vertical":
+        return frame[:-1, :], frame[1:, :]
+    return frame[:-1, :-1], frame[1:, 1:]
+
+
+class HistogramAccumulator:
+    """
+    Histograma global de intensidades (0-255) y entropía media por frame.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(256, dtype=np.int64)
+        self.frames = 0
+        self.entropy_sum = 0.0
+
+    def update(self, frame):
+        counts = np.bincount(frame.ravel(), minlength=256)
+        self.counts += counts
+        self.frames += 1
+        self.entropy_sum += entropy(counts / counts.sum() + 1e-12)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.frames += other.frames
+        self.entropy_sum += other.entropy_sum
+        return self
+
+    def entropy_global(self):
+        # Igual que entropy_tests.entropy_global sobre todos los frames
+        return float(entropy(self.counts / self.counts.sum() + 1e-12))
+
+    def entropy_per_frame(self):
+        return float(self.entropy_sum / max(self.frames, 1))
+
+    def variance(self):
+        levels = np.arange(256)
+        total = self.counts.sum()
+        mean = np.dot(self.counts, levels) / total
+        return float(np.dot(self.counts, (levels - mean) ** 2) / total)
+
+
+class CorrelationAccumulator:
+    """
+    Sumas n, Σx, Σy, Σx², Σy², Σxy por dirección; los productos de píxeles
+    de 8 bits se acumulan exactos en float64 dentro de cada frame y en
+    enteros de Python entre frames.
+    """
+
+    def __init__(self, directions=DIRECTIONS):
+        self.sums = {mode: [0] * 6 for mode in directions}
+
+    def update(self, frame):
+        frame = frame.astype(np.float64)
+        for mode, s in self.sums.items():
+            x, y = _pairs(frame, mode)
+            x = x.ravel()
+            y = y.ravel()
+            s[0] += x.size
+            s[1] += int(x.sum())
+            s[2] += int(y.sum())
+            s[3] += int(np.dot(x, x))
+            s[4] += int(np.dot(y, y))
+            s[5] += int(np.dot(x, y))
+
+    def merge(self, other):
+        for mode, s in self.sums.items():
+            self.sums[mode] = [a + b for a, b in zip(s, other.sums[mode])]
+        return self
+
+    def correlation(self, mode="horizontal"):
+        n, sx, sy, sxx, syy, sxy = self.sums[mode]
+        cov = n * sxy - sx * sy
+        var = (n * sxx - sx * sx) * (n * syy - sy * sy)
+        return float(cov / np.sqrt(float(var))) if var > 0 else 0.0
+
+
+class DifferentialAccumulator:
+    """
+    NPCR/UACI acumulados sobre pares de imágenes (mismo tamaño).
+    """
+
+    def __init__(self):
+        self.pixels = 0
+        self.changed = 0
+        self.abs_diff = 0
+
+    def update(self, img1, img2):
+        if img1.shape != img2.shape:
+            raise ValueError("NPCR/UACI requieren imágenes del mismo tamaño")
+        diff = np.abs(img1.astype(np.int16) - img2.astype(np.int16))
+        self.pixels += diff.size
+        self.changed += int(np.count_nonzero(diff))
+        self.abs_diff += int(diff.sum(dtype=np.int64))
+
+    def merge(self, other):
+        self.pixels += other.pixels
+        self.changed += other.changed
+        self.abs_diff += other.abs_diff
+        return self
+
+    def npcr(self):
+        return 100.0 * self.changed / self.pixels if self.pixels else 0.0
+
+    def uaci(self):
+        return 100.0 * self.abs_diff / (255.0 * self.pixels) if self.pixels else 0.0
+
+
+class VideoStatistics:
+    """
+    Todas las estadísticas de un video en una pasada: histograma, correlación
+    en las tres direcciones y NPCR/UACI entre frames consecutivos.
+    """
+
+    def __init__(self, directions=DIRECTIONS):
+        self.histogram = HistogramAccumulator()
+        self.correlation = CorrelationAccumulator(directions)
+        self.consecutive = DifferentialAccumulator()
+        self.first = None
+        self.previous = None
+        self.frames = 0
+        self.read_time = 0.0
+
+    def update(self, frame):
+        if self.first is None:
+            self.first = frame
+        self.histogram.update(frame)
+        self.correlation.update(frame)
+        if self.previous is not None and self.previous.shape == frame.shape:
+            self.consecutive.update(self.previous, frame)
+        self.previous = frame
+        self.frames += 1
+
+    def merge(self, other):
+        """
+        Une las estadísticas de un tramo posterior del mismo video (p. ej.
+        calculado en otro proceso), incluido el par de frames de la frontera.
+        """
+        if other.frames == 0:
+            return self
+        if self.previous is not None and self.previous.shape == other.first.shape:
+            self.consecutive.update(self.previous, other.first)
+        if self.first is None:
+            self.first = other.first
+        self.histogram.merge(other.histogram)
+        self.correlation.merge(other.correlation)
+        self.consecutive.merge(other.consecutive)
+        self.previous = other.previous
+        self.frames += other.frames
+        self.read_time += other.read_time
+        return self
+
+    def consume(self, frames):
+        # El tiempo de lectura excluye el de los acumuladores
+        frames = iter(frames)
+        while True:
+            start = time.time()
+            frame = next(frames, None)
+            self.read_time += time.time() - start
+            if frame is None:
+                break
+            self.update(frame)
+        return self
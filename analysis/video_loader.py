@@ -2,7 +2,24 @@
 import cv2
 import time
 
-def load_video(path, max_frames=50):
+from video.raw_sink import RawCipherReader
+
+
+def is_raw(path):
+    # Stream de ciphertext sin pérdidas de main.py (RawCipherWriter)
+    return str(path).endswith(".raw")
+
+def load_video(path, max_frames=50, cache=None):
+    """
+    Con `cache` (analysis.frame_cache.FrameCache) los frames se leen de la
+    caché en disco como un memmap (N, alto, ancho) en lugar de una lista.
+    """
+    if cache is not None:
+        start = time.time()
+        frames = cache.get(path, max_frames=max_frames)
+        if frames is not None:
+            return frames, time.time() - start
+
     cap = cv2.VideoCapture(path)
     frames = []
     start = time.time()
@@ -17,3 +34,50 @@ def load_video(path, max_frames=50):
     cap.release()
     elapsed = time.time() - start
     return frames, elapsed
+
+
+def frame_count(path):
+    if is_raw(path):
+        return len(RawCipherReader(path))
+    cap = cv2.VideoCapture(path)
+    n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return n
+
+
+def iter_video(path, max_frames=None, start=0, cache=None):
+    """
+    Frames en escala de grises uno a uno, sin retenerlos (para análisis en
+    streaming de videos completos). `start` salta al frame indicado. Con
+    `cache` los frames salen de la caché en disco si caben en ella. Un
+    stream .raw se lee directamente por memmap (sin caché ni decodificación)
+    y cada frame sale como sus bytes en orden de almacenamiento, (alto,
+    ancho*canales): convertir ciphertext a gris mezclaría canales y sesgaría
+    el histograma.
+    """
+    if is_raw(path):
+        frames = RawCipherReader(path).frames
+        stop = None if max_frames is None else start + max_frames
+        for frame in frames[start:stop]:
+            yield frame.reshape(frame.shape[0], -1)
+        return
+
+    if cache is not None:
+        frames = cache.get(path, start=start, max_frames=max_frames)
+        if frames is not None:
+            yield from frames
+            return
+
+    cap = cv2.VideoCapture(path)
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    count = 0
+    try:
+        while max_frames is None or count < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            count += 1
+    finally:
+        cap.release()
@@ -0,0 +1,276 @@
+"""
+batch.py
+Modo batch sin interfaz gráfica: solo cifrado o solo descifrado.
+
+No importa gui.viewer ni llama a imshow/waitKey, por lo que funciona con
+opencv-python-headless en servidores sin display. La verificación por
+descifrado es opcional y muestreada.
+
+Uso:
+    python batch.py encrypt [--input IN] [--output OUT.mnak] [--verify-every N | --verify-fraction P]
+    python batch.py decrypt [--input IN.mnak] [--output OUT.mp4] [--start FRAME]
+    python batch.py nist [--input IN.mnak|IN.raw] [--sequence-bits N] [--max-mb MB] [--workers N]
+    python batch.py sensitivity [--input IN.raw] [--frames N] [--params a b ...] [--deltas 1e-15 ...]
+"""
+
+import argparse
+import json
+import random
+import sys
+
+import cv2
+import numpy as np
+
+from config.settings import *
+from crypto.chaos_generator import ChaosKeyGenerator
+from crypto.mnk_encryptor import MNAKFrameEncryptor
+from crypto.checkpoints import CheckpointWriter, load_checkpoints, seek
+from crypto.process_engine import ProcessPoolEncryptionEngine
+from video.video_io import open_video, create_writer
+from video.mnak_container import MNAKContainerReader, MNAKContainerWriter
+from utils.pipeline import Pipeline, map_stage
+from utils.timer import Timer
+from analysis.nist_tests import NISTStream, iter_ciphertext
+from analysis.key_sensitivity_sweep import PARAMS, DELTAS, perturbations, run_sweep
+
+
+def make_encryptor(seed, warmup):
+    keygen = ChaosKeyGenerator(seed=seed)
+    keygen.step_many(warmup)
+    return MNAKFrameEncryptor(keygen)
+
+
+def make_sampler(every=0, fraction=0.0, rng_seed=0):
+    """
+    Decide qué frames se verifican: cada N frames o una fracción aleatoria.
+    """
+    if every > 0:
+        return lambda frame_id: frame_id % every == 0
+    if fraction > 0:
+        rng = random.Random(rng_seed)
+        return lambda frame_id: rng.random() < fraction
+    return lambda frame_id: False
+
+
+def encrypt_video(args):
+    encryptor = make_encryptor(args.seed, args.warmup)
+    sample = make_sampler(args.verify_every, args.verify_fraction)
+
+    cap = open_video(args.input)
+    container = MNAKContainerWriter(args.output, args.width, args.height, FPS)
+    checkpoints = CheckpointWriter(args.output + ".ckpt", CHECKPOINT_INTERVAL)
+    engine = ProcessPoolEncryptionEngine(encryptor, workers=args.workers) if args.workers > 0 else None
+
+    # Estado del cifrador antes de cada frame muestreado
+    sampled_states = {}
+
+    def read_frames():
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+
+    def resize(frame):
+        return cv2.resize(frame, (args.width, args.height))
+
+    def encrypt_frames(frames):
+        def jobs():
+            for frame_id, frame in enumerate(frames):
+                checkpoints.record(frame_id, encryptor)
+                if sample(frame_id):
+                    sampled_states[frame_id] = encryptor.get_state()
+                yield (frame,)
+
+        stream = engine.imap(jobs()) if engine is not None else \
+            ((job, encryptor.encrypt(*job)) for job in jobs())
+        for frame_id, ((frame,), ciphertext) in enumerate(stream):
+            yield frame_id, frame, ciphertext
+
+    def write(item):
+        container.append(item[2])
+        return item
+
+    def verify(item):
+        frame_id, frame, ciphertext = item
+        state = sampled_states.pop(frame_id, None)
+        if state is None:
+            return None
+        verifier = MNAKFrameEncryptor(ChaosKeyGenerator.from_state(state['chaos']))
+        verifier.set_state(state)
+        decrypted, _ = verifier.decrypt(ciphertext)
+        return np.array_equal(decrypted, frame)
+
+    timer = Timer()
+    n_frames = n_verified = n_failed = 0
+    pipeline = Pipeline(read_frames(), [
+        map_stage(resize),
+        encrypt_frames,
+        map_stage(write),
+        map_stage(verify),
+    ], maxsize=PIPELINE_QUEUE_SIZE)
+
+    try:
+        for ok in pipeline:
+            n_frames += 1
+            if ok is not None:
+                n_verified += 1
+                n_failed += not ok
+    finally:
+        if engine is not None:
+            engine.close()
+        cap.release()
+        container.close()
+        checkpoints.close()
+
+    print(f"Cifrados {n_frames} frames -> {args.output}")
+    print(f"Verificados {n_verified} frames, {n_failed} fallidos")
+    print(f"Tiempo: {timer.elapsed():.2f}s ({n_frames / max(timer.elapsed(), 1e-9):.2f} fps)")
+    return 1 if n_failed else 0
+
+
+def decrypt_video(args):
+    decryptor = make_encryptor(args.seed, args.warmup)
+    reader = MNAKContainerReader(args.input)
+    if args.start > 0:
+        _, checkpoints = load_checkpoints(args.input + ".ckpt")
+        seek(decryptor, checkpoints, args.start)
+
+    writer = create_writer(args.output, reader.fps, (reader.width, reader.height))
+
+    def read_records():
+        # Vistas sobre el mmap, sin copia
+        for i in range(args.start, len(reader)):
+            yield reader[i]
+
+    def decrypt(ciphertext):
+        # El frame descifrado va a un buffer nuevo; la vista se libera aquí,
+        # aunque decrypt falle y su traceback retenga este frame
+        with ciphertext:
+            if not ciphertext:
+                # frame descartado por realtime.py: avanza las claves sin descifrar
+                decryptor.skip(1)
+                return None
+            frame, _ = decryptor.decrypt(ciphertext)
+        return frame
+
+    last = [None]
+
+    def write(frame):
+        # un frame descartado repite el anterior para conservar la duración
+        frame = last[0] if frame is None else frame
+        if frame is not None:
+            writer.write(frame)
+            last[0] = frame
+
+    timer = Timer()
+    n_frames = 0
+    frames = iter(Pipeline(read_records(), [map_stage(decrypt), map_stage(write)],
+                           maxsize=PIPELINE_QUEUE_SIZE))
+    try:
+        for _ in frames:
+            n_frames += 1
+    finally:
+        # Primero el pipeline (hilos detenidos, colas con vistas liberadas)
+        # y después el mmap del contenedor
+        frames.close()
+        writer.release()
+        reader.close()
+
+    print(f"Descifrados {n_frames} frames -> {args.output}")
+    print(f"Tiempo: {timer.elapsed():.2f}s ({n_frames / max(timer.elapsed(), 1e-9):.2f} fps)")
+    return 0
+
+
+def nist_report(args):
+    max_bytes = int(args.max_mb * (1 << 20)) if args.max_mb else None
+    timer = Timer()
+    stream = NISTStream(args.sequence_bits, workers=args.workers)
+    results = stream.consume(iter_ciphertext(args.input, max_bytes))
+
+    print(f"{stream.sequences} secuencias de {args.sequence_bits} bits "
+          f"({stream.sequences * args.sequence_bits / 8 / (1 << 20):.1f} MB) "
+          f"en {timer.elapsed():.1f}s")
+    # Proporción y uniformidad de la peor subprueba (plantilla, dirección, ...)
+    print(f"{'Prueba':<24} {'Subpruebas':>10} {'Proporción':>11} {'Mínima':>8} {'Uniformidad':>12}")
+    for name, r in results.items():
+        status = "OK"
+        if not r["passed"]:
+            status = f"FALLA ({r['failed_subtests']}/{r['subtests']}, ~{r['expected_failures']:.1f} por azar)"
+        print(f"{name:<24} {r['subtests']:>10} {r['proportion']:>11.4f} {r['min_proportion']:>8.4f} "
+              f"{r['uniformity_p']:>12.4f}  {status}")
+    return 0 if results and all(r["passed"] for r in results.values()) else 1
+
+
+def sensitivity_report(args):
+    timer = Timer()
+    items = perturbations(args.params, args.deltas)
+    rows = run_sweep(args.input, items, args.frames, args.seed, args.warmup,
+                     workers=args.workers or None)
+
+    print(f"{len(items)} perturbaciones x {args.frames} frames en {timer.elapsed():.1f}s")
+    print(f"{'Parámetro':<10} {'Delta':>10} {'Aplicado':>11} {'PSNR (dB)':>10} {'SSIM':>8} {'NPCR (%)':>9}")
+    for r in rows:
+        flag = f"  {r['recovered']} frames descifrados" if r["recovered"] else ""
+        print(f"{r['param']:<10} {r['delta']:>10.0e} {r['applied']:>11.3e} {r['psnr']:>10.3f} "
+              f"{r['ssim']:>8.4f} {r['npcr']:>9.3f}{flag}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cifrado/descifrado batch sin GUI")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enc = sub.add_parser("encrypt", help="cifra un video a un contenedor MNAK")
+    enc.add_argument("--input", default=VIDEO_INPUT)
+    enc.add_argument("--output", default=MNAK_CONTAINER)
+    enc.add_argument("--width", type=int, default=FRAME_WIDTH)
+    enc.add_argument("--height", type=int, default=FRAME_HEIGHT)
+    enc.add_argument("--workers", type=int, default=ENCRYPT_WORKERS)
+    verify = enc.add_mutually_exclusive_group()
+    verify.add_argument("--verify-every", type=int, default=0,
+                        help="verifica 1 de cada N frames (0 = sin verificación)")
+    verify.add_argument("--verify-fraction", type=float, default=0.0,
+                        help="verifica una fracción aleatoria de frames, p.ej. 0.01")
+
+    dec = sub.add_parser("decrypt", help="descifra un contenedor MNAK a video")
+    dec.add_argument("--input", default=MNAK_CONTAINER)
+    dec.add_argument("--output", default=VIDEO_DECRYPTED)
+    dec.add_argument("--start", type=int, default=0,
+                     help="primer frame (usa el índice de checkpoints)")
+
+    nist = sub.add_parser("nist", help="batería NIST SP 800-22 sobre el ciphertext")
+    nist.add_argument("--input", default=MNAK_CONTAINER)
+    nist.add_argument("--sequence-bits", type=int, default=1_000_000)
+    nist.add_argument("--max-mb", type=float, default=0,
+                      help="analiza solo los primeros MB (0 = todo)")
+    nist.add_argument("--workers", type=int, default=1)
+
+    sens = sub.add_parser("sensitivity", help="barrido de sensibilidad a la clave (ciphertext AES .raw)")
+    sens.add_argument("--input", default=VIDEO_ENCRYPTED_RAW)
+    sens.add_argument("--frames", type=int, default=8)
+    sens.add_argument("--params", nargs="+", choices=PARAMS, default=list(PARAMS))
+    sens.add_argument("--deltas", nargs="+", type=float, default=list(DELTAS))
+    sens.add_argument("--workers", type=int, default=0, help="procesos (0 = todos los núcleos)")
+    sens.add_argument("--output", default=None, help="guarda las filas como JSON")
+
+    for p in (enc, dec, sens):
+        p.add_argument("--seed", type=float, default=0.1)
+        p.add_argument("--warmup", type=int, default=1000)
+
+    args = parser.parse_args(argv)
+    if args.command == "encrypt":
+        return encrypt_video(args)
+    if args.command == "nist":
+        return nist_report(args)
+    if args.command == "sensitivity":
+        return sensitivity_report(args)
+    return decrypt_video(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+"""
+suite.py
+Suite de benchmarks con casos parametrizados y comparación contra un baseline
+
+Uso:
+    python -m benchmarks.suite run [--output FILE.json] [--filter TEXTO] [--repeats R]
+    python -m benchmarks.suite compare BASELINE.json ACTUAL.json [--threshold 0.10]
+    python -m benchmarks.suite list
+
+Cada caso se registra con @case(nombre, params); su función recibe un valor
+del parámetro y devuelve (fn, unidades), donde fn es la operación a medir y
+unidades (opcional) el trabajo por llamada (frames, bytes...) para reportar
+throughput. Los resultados se guardan como JSON con la mediana y el mínimo
+por llamada de cada caso "nombre[param]".
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from crypto.chaos_generator import ChaosKeyGenerator
+from crypto.chaos_generator_stenflo import ChaosKeyGenerator as StenfloGenerator
+from crypto.sdk_generator import SDKGenerator, SDKEnsemble
+from crypto.chaos_ensemble import ChaosEnsemble, StenfloEnsemble
+from crypto.aes_encryptor import AESCFBFrameEncryptor
+from crypto.mnk_encryptor import MNAKFrameEncryptor
+from video.mnak_container import MNAKContainerWriter
+from utils.pipeline import Pipeline, map_stage
+from utils.audio_extractor import AudioExtractor
+from analysis.ssim_tests import ssim, SSIMEngine
+from analysis.entropy_tests import entropy_global, entropy_per_frame
+from analysis.nist_tests import monobit_test, block_frequency_test, run_battery, to_bits
+
+CASES = {}
+
+FRAME_SIZES = {
+    "374x566": (566, 374),
+    "480p": (480, 854),
+    "1080p": (1080, 1920),
+}
+
+
+def case(name, params):
+    def register(fn):
+        CASES[name] = (fn, params)
+        return fn
+    return register
+
+
+def _frame(size, seed=0):
+    h, w = FRAME_SIZES[size]
+    return np.random.default_rng(seed).integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+
+def _chaos(warmup=100):
+    chaos = ChaosKeyGenerator()
+    chaos.step_many(warmup)
+    return chaos
+
+
+# ---------------------------------------------------------------- generadores
+
+@case("chaos.step", params=[0.01, 0.001])
+def bench_chaos_step(dt):
+    chaos = ChaosKeyGenerator(dt=dt)
+    return chaos.step, 1
+
+
+@case("chaos.step_many", params=[1000])
+def bench_chaos_step_many(n):
+    chaos = ChaosKeyGenerator()
+    return (lambda: chaos.step_many(n)), n
+
+
+# El mapa de Stenflo diverge desde el segundo paso (|w| ~ 1e7, luego
+# inf/NaN): cada llamada reinicia el estado y mide un lote de pasos, así el
+# reinicio se amortiza y el coste por paso es el de step()
+
+@case("stenflo.step", params=[1000])
+def bench_stenflo_step(n):
+    gen = StenfloGenerator()
+    seed = (gen.x, gen.y, gen.z, gen.w)
+
+    def steps():
+        gen.x, gen.y, gen.z, gen.w = seed
+        for _ in range(n):
+            gen.step()
+    return steps, n
+
+
+@case("stenflo.generate_key", params=["374x566"])
+def bench_stenflo_key(size):
+    shape = FRAME_SIZES[size] + (3,)
+
+    def generate():
+        StenfloGenerator().generate_key(shape)
+    return generate, 1
+
+
+@case("sdk.generate", params=[None])
+def bench_sdk_generate(_):
+    return SDKGenerator(_chaos()).generate, 1
+
+
+# Ensembles: unidades = sesiones avanzadas por llamada (comparar con chaos.step)
+
+@case("chaos_ensemble.step", params=[1, 16, 256])
+def bench_chaos_ensemble_step(sessions):
+    ensemble = ChaosEnsemble(np.linspace(0.05, 0.2, sessions))
+    return ensemble.step, sessions
+
+
+@case("stenflo_ensemble.step", params=[256])
+def bench_stenflo_ensemble_step(sessions, n=100):
+    ensemble = StenfloEnsemble(np.linspace(0.1, 0.2, sessions))
+    seed = [v.copy() for v in (ensemble.x, ensemble.y, ensemble.z, ensemble.w)]
+
+    def steps():
+        ensemble.x, ensemble.y, ensemble.z, ensemble.w = (v.copy() for v in seed)
+        with np.errstate(over="ignore", invalid="ignore"):
+            for _ in range(n):
+                ensemble.step()
+    return steps, n * sessions
+
+
+@case("sdk_ensemble.generate", params=[16])
+def bench_sdk_ensemble(sessions):
+    return SDKEnsemble(ChaosEnsemble(np.linspace(0.05, 0.2, sessions))).generate, sessions
+
+
+# ---------------------------------------------------------------- cifrado
+
+@case("aes_cfb.encrypt", params=list(FRAME_SIZES))
+def bench_aes_cfb(size):
+    frame = _frame(size)
+    encryptor = AESCFBFrameEncryptor(_chaos())
+    return (lambda: encryptor.encrypt(frame)), 1
+
+
+@case("mnak.serialize", params=list(FRAME_SIZES))
+def bench_mnak_serialize(size):
+    frame = _frame(size)
+    audio = np.zeros(1470, dtype=np.int16)
+    encryptor = MNAKFrameEncryptor(_chaos(), audio_samples_per_frame=len(audio))
+    state = (0.1, 0.2, 0.3, 0.4)
+    out = np.empty(encryptor.record_size(frame, audio), dtype=np.uint8)
+    return (lambda: encryptor._serialize_mnak(frame, audio, state, out)), 1
+
+
+@case("mnak.deserialize", params=list(FRAME_SIZES))
+def bench_mnak_deserialize(size):
+    frame = _frame(size)
+    audio = np.zeros(1470, dtype=np.int16)
+    encryptor = MNAKFrameEncryptor(_chaos(), audio_samples_per_frame=len(audio))
+    data = bytes(encryptor._serialize_mnak(frame, audio, (0.1, 0.2, 0.3, 0.4)))
+    return (lambda: encryptor._deserialize_mnak(data)), 1
+
+
+@case("mnak.encrypt_decrypt", params=["374x566", "480p"])
+def bench_mnak_round_trip(size):
+    # Cifrado + descifrado MNAK en memoria de frames sintéticos (sin
+    # decodificación de video ni escritura)
+    frames = [_frame(size, i) for i in range(4)]
+    encryptor = MNAKFrameEncryptor(_chaos())
+    decryptor = MNAKFrameEncryptor(_chaos())
+
+    def run():
+        for frame in frames:
+            decryptor.decrypt(encryptor.encrypt(frame))
+    return run, len(frames)
+
+
+# ---------------------------------------------------------------- extremo a extremo
+
+@case("e2e.pipeline", params=["374x566", "480p"])
+def bench_end_to_end(size, n_frames=16):
+    # Flujo de main_mnak sobre frames sintéticos 1080p: Pipeline con
+    # redimensión -> cifrado MNAK -> escritura del contenedor -> descifrado.
+    # Unidades = frames, así el throughput es fps de extremo a extremo
+    h, w = FRAME_SIZES[size]
+    source = [_frame("1080p", i) for i in range(n_frames)]
+    encryptor = MNAKFrameEncryptor(_chaos())
+    decryptor = MNAKFrameEncryptor(_chaos())
+    path = os.path.join(tempfile.gettempdir(), f"bench_e2e_{os.getpid()}.mnak")
+
+    def encrypt_frames(frames):
+        for frame in frames:
+            yield encryptor.encrypt(frame)
+
+    def run():
+        with MNAKContainerWriter(path, w, h, 30) as container:
+            def write(ciphertext):
+                container.append(ciphertext)
+                return ciphertext
+
+            for _ in Pipeline(iter(source), [
+                map_stage(lambda frame: cv2.resize(frame, (w, h))),
+                encrypt_frames,
+                map_stage(write),
+                map_stage(lambda ciphertext: decryptor.decrypt(ciphertext)[0]),
+            ]):
+                pass
+        os.remove(path)
+    return run, n_frames
+
+
+# ---------------------------------------------------------------- audio
+
+@case("audio.get_chunk_for_frame", params=[30, 60])
+def bench_audio_chunk(fps):
+    extractor = AudioExtractor("synthetic", fps=fps)
+    extractor.sample_rate = 44100
+    extractor.samples_per_frame = int(extractor.sample_rate / fps)
+    extractor.audio_data = np.zeros(extractor.sample_rate * 60, dtype=np.int16)
+    n_frames = 60 * fps
+    index = [0]
+
+    def chunk():
+        extractor.get_audio_chunk_for_frame(index[0] % n_frames)
+        index[0] += 1
+    return chunk, 1
+
+
+# ---------------------------------------------------------------- análisis
+
+@case("analysis.ssim", params=list(FRAME_SIZES))
+def bench_ssim(size):
+    a, b = _frame(size, 0), _frame(size, 1)
+    return (lambda: ssim(a, b)), 1
+
+
+@case("analysis.ssim_engine", params=[1, 8])
+def bench_ssim_engine(batch):
+    a = np.stack([_frame("374x566", i)[..., 0] for i in range(batch)])
+    b = np.stack([_frame("374x566", i + batch)[..., 0] for i in range(batch)])
+    engine = SSIMEngine()
+    return (lambda: engine.ssim(a, b)), batch
+
+
+@case("analysis.entropy_global", params=[10])
+def bench_entropy_global(n_frames):
+    frames = [_frame("374x566", i) for i in range(n_frames)]
+    return (lambda: entropy_global(frames)), n_frames
+
+
+@case("analysis.entropy_per_frame", params=[10])
+def bench_entropy_per_frame(n_frames):
+    frames = [_frame("374x566", i) for i in range(n_frames)]
+    return (lambda: entropy_per_frame(frames)), n_frames
+
+
+@case("analysis.nist_monobit", params=["374x566"])
+def bench_nist_monobit(size):
+    data = _frame(size)
+    return (lambda: monobit_test(data)), 1
+
+
+@case("analysis.nist_block_frequency", params=[128, 1024])
+def bench_nist_block_frequency(block_size):
+    data = _frame("374x566")
+    return (lambda: block_frequency_test(data, block_size)), 1
+
+
+@case("analysis.nist_battery", params=[1_000_000])
+def bench_nist_battery(n_bits):
+    bits = to_bits(np.random.default_rng(0).integers(0, 256, n_bits // 8, dtype=np.uint8))
+    return (lambda: run_battery(bits)), n_bits
+
+
+def measure(fn, repeats=5, min_time=0.05):
+    """
+    Mediana y mínimo del tiempo por llamada. El número de llamadas por
+    repetición se calibra para que cada una dure al menos min_time.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+
+    times = [elapsed / number]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return float(np.median(times)), float(np.min(times)), number
+
+
+def run(filter_text=None, repeats=5, min_time=0.05):
+    results = {}
+    for name, (setup, params) in CASES.items():
+        for param in params:
+            key = name if param is None else f"{name}[{param}]"
+            if filter_text and filter_text not in key:
+                continue
+            fn, units = setup(param)
+            median, best, number = measure(fn, repeats, min_time)
+            results[key] = {
+                "median_s": median,
+                "min_s": best,
+                "number": number,
+                "repeats": repeats,
+                "throughput_per_s": units / median if median > 0 else None,
+            }
+            print(f"{key:<45} {median * 1e3:>12.4f} ms  {units / median:>14.1f} /s")
+    return results
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Casos comunes con su cociente actual/baseline de la mediana; un cociente
+    mayor que 1 + threshold es una regresión.
+    """
+    rows = []
+    for key in sorted(set(baseline) & set(current)):
+        ratio = current[key]["median_s"] / baseline[key]["median_s"]
+        rows.append((key, baseline[key]["median_s"], current[key]["median_s"],
+                     ratio, ratio > 1 + threshold))
+    return rows
+
+
+def _metadata():
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="ejecuta los casos y guarda JSON")
+    run_p.add_argument("--output", default="data/benchmarks.json")
+    run_p.add_argument("--filter", default=None, help="solo casos cuyo nombre contiene el texto")
+    run_p.add_argument("--repeats", type=int, default=5)
+    run_p.add_argument("--min-time", type=float, default=0.05)
+
+    cmp_p = sub.add_parser("compare", help="compara contra un baseline")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("current")
+    cmp_p.add_argument("--threshold", type=float, default=0.10,
+                       help="aumento relativo de la mediana tolerado (0.10 = 10%%)")
+
+    sub.add_parser("list", help="lista los casos registrados")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name, (_, params) in CASES.items():
+            print(f"{name:<35} {params}")
+        return 0
+
+    if args.command == "run":
+        results = run(args.filter, args.repeats, args.min_time)
+        with open(args.output, "w") as f:
+            json.dump({"meta": _metadata(), "results": results}, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    with open(args.current) as f:
+        current = json.load(f)["results"]
+
+    rows = compare(baseline, current, args.threshold)
+    print(f"{'Caso':<45} {'Base (ms)':>12} {'Actual (ms)':>12} {'Cociente':>9}")
+    for key, base, cur, ratio, regressed in rows:
+        flag = "  REGRESIÓN" if regressed else ""
+        print(f"{key:<45} {base * 1e3:>12.4f} {cur * 1e3:>12.4f} {ratio:>8.2f}x{flag}")
+
+    regressions = [r for r in rows if r[4]]
+    missing = sorted(set(baseline) - set(current))
+    if missing:
+        print(f"Casos del baseline sin medir: {', '.join(missing)}")
+    print(f"{len(regressions)} regresiones de {len(rows)} casos (umbral {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,39 @@
 #config/settings.py
+import os as _os
+
 VIDEO_INPUT = "data/video_prueba3.mp4"
 VIDEO_ENCRYPTED = "data/encrypted_video.mp4"
 VIDEO_DECRYPTED = "data/decrypted_video.mp4"
+MNAK_CONTAINER = "data/encrypted_video.mnak"
+VIDEO_ENCRYPTED_RAW = "data/encrypted_video.raw"
 
 FRAME_WIDTH = 374
 FRAME_HEIGHT = 566
 FPS = 30
+
+# Chaos-state checkpoints written next to the ciphertext every N frames
+CHECKPOINT_INTERVAL = 300
+
+# Worker processes for AES (0 = encrypt in the main process)
+ENCRYPT_WORKERS = 0
+
+# Max frames buffered between pipeline stages
+PIPELINE_QUEUE_SIZE = 8
+
+# The lossy encrypted preview (VIDEO_ENCRYPTED) keeps 1 of every N frames
+# (0 = no preview); the decryptable ciphertext goes to VIDEO_ENCRYPTED_RAW
+PREVIEW_EVERY = 10
+
+# ffmpeg executable used to stream audio: the FFMPEG_BIN environment
+# variable if set, else the binary bundled with imageio-ffmpeg (a moviepy
+# dependency), else ffmpeg from PATH
+FFMPEG_BIN = _os.environ.get("FFMPEG_BIN")
+if not FFMPEG_BIN:
+    try:
+        import imageio_ffmpeg as _imageio_ffmpeg
+        FFMPEG_BIN = _imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        FFMPEG_BIN = "ffmpeg"
+
+# Per-stage timings (decode, AES, write, ...) read by test.py for the report
+STAGE_PROFILE = "data/stage_profile.json"
@@ -1,8 +1,11 @@
 import numpy as np
 from Crypto.Cipher import AES
-from crypto.sdk_generator import SDKGenerator
+from crypto.sdk_generator import SDKGenerator, SDKEnsemble
+from crypto.parallel_ctr import ParallelCTR
 
 class AESCFBFrameEncryptor:
+    mode = 'cfb'
+
     def __init__(self, chaos_generator):
         self.sdkg = SDKGenerator(chaos_generator)
 
@@ -10,14 +13,97 @@ class AESCFBFrameEncryptor:
         key_material = self.sdkg.generate()
         return key_material[:16], key_material[16:32]
 
-    def encrypt(self, frame):
+    def prepare(self, frame):
+        """
+        Sequential half of encrypt(): derives the next key/IV and returns
+        (key, iv, plaintext) so the AES work can run elsewhere.
+        """
         key, iv = self._derive_key_iv()
+        return key, iv, frame
+
+    def encrypt(self, frame):
+        return self.encrypt_prepared(*self.prepare(frame))
+
+    def encrypt_prepared(self, key, iv, frame):
         cipher = AES.new(key, AES.MODE_CFB, iv=iv, segment_size=128)
         encrypted = cipher.encrypt(frame.tobytes())
         return np.frombuffer(encrypted, dtype=np.uint8).reshape(frame.shape)
 
-    def decrypt(self, encrypted_frame):
+    def prepare_decrypt(self, encrypted_frame):
+        """
+        Sequential half of decrypt(); pass the result to decrypt_prepared().
+        """
         key, iv = self._derive_key_iv()
+        return key, iv, encrypted_frame
+
+    def decrypt_prepared(self, key, iv, encrypted_frame):
         cipher = AES.new(key, AES.MODE_CFB, iv=iv, segment_size=128)
         decrypted = cipher.decrypt(encrypted_frame.tobytes())
         return np.frombuffer(decrypted, dtype=np.uint8).reshape(encrypted_frame.shape)
+
+    def decrypt(self, encrypted_frame):
+        return self.decrypt_prepared(*self.prepare_decrypt(encrypted_frame))
+
+    def get_state(self):
+        return {"chaos": self.sdkg.chaos.get_state()}
+
+    def set_state(self, state):
+        self.sdkg.chaos.set_state(state["chaos"])
+
+    def skip(self, n_frames):
+        # One chaos step per frame, same as _derive_key_iv
+        self.sdkg.chaos.step_many(n_frames)
+
+
+class AESCTRFrameEncryptor(AESCFBFrameEncryptor):
+    """
+    Same chaos/SHA3 key and IV derivation as AESCFBFrameEncryptor, but with
+    AES-CTR so each frame is split into byte ranges encrypted in parallel.
+    """
+
+    mode = 'ctr'
+
+    def __init__(self, chaos_generator, workers=None):
+        super().__init__(chaos_generator)
+        self.ctr = ParallelCTR(workers)
+
+    def encrypt_prepared(self, key, iv, frame):
+        frame = np.ascontiguousarray(frame)
+        return self.ctr.crypt(key, iv, frame, np.empty_like(frame))
+
+    def decrypt_prepared(self, key, iv, encrypted_frame):
+        encrypted_frame = np.ascontiguousarray(encrypted_frame)
+        return self.ctr.crypt(key, iv, encrypted_frame, np.empty_like(encrypted_frame))
+
+
+class AESCFBEnsembleEncryptor:
+    """
+    AES-CFB for S streams advancing in lockstep (e.g. cameras): one
+    ChaosEnsemble step per tick derives every key/IV. Stream s gets the same
+    ciphertext as an AESCFBFrameEncryptor on the scalar generator of session s.
+    """
+
+    mode = 'cfb'
+
+    def __init__(self, ensemble):
+        self.sdkg = SDKEnsemble(ensemble)
+
+    def _keys(self, frames):
+        digests = self.sdkg.generate()
+        if len(frames) != len(digests):
+            raise ValueError(f"Expected {len(digests)} frames (one per stream), got {len(frames)}")
+        return [(digest[:16], digest[16:32]) for digest in digests]
+
+    def encrypt(self, frames):
+        out = []
+        for (key, iv), frame in zip(self._keys(frames), frames):
+            cipher = AES.new(key, AES.MODE_CFB, iv=iv, segment_size=128)
+            out.append(np.frombuffer(cipher.encrypt(frame.tobytes()), dtype=np.uint8).reshape(frame.shape))
+        return out
+
+    def decrypt(self, encrypted_frames):
+        out = []
+        for (key, iv), frame in zip(self._keys(encrypted_frames), encrypted_frames):
+            cipher = AES.new(key, AES.MODE_CFB, iv=iv, segment_size=128)
+            out.append(np.frombuffer(cipher.decrypt(frame.tobytes()), dtype=np.uint8).reshape(frame.shape))
+        return out
@@ -0,0 +1,187 @@
+import numpy as np
+
+from crypto.chaos_generator import ChaosKeyGenerator
+from crypto.chaos_generator_stenflo import ChaosKeyGenerator as StenfloGenerator
+
+
+class ChaosEnsemble:
+    """
+    S independent ChaosKeyGenerator sessions held as arrays and advanced
+    with one vectorized step. Each session may have its own seed and
+    parameters; row s of every output is bit-identical to the scalar
+    generator with the same seed and parameters (see get_state/generator).
+
+    State is structure-of-arrays: `state` is (S, 4) with x/y/z/w columns and
+    the three delay lines share one (S, 3, L) ring buffer, so each step is a
+    single gather and a single scatter whatever S is.
+    """
+
+    _PARAMS = ("a", "b", "c", "d", "dt", "tau1", "tau2", "tau3")
+
+    def __init__(self, seeds, dt=0.01, a=2.0, b=2.0, c=0.5, d=14.5,
+                 tau1=0.12, tau2=0.25, tau3=0.38):
+        seeds = np.atleast_1d(np.asarray(seeds, dtype=np.float64))
+        n = len(seeds)
+        values = dict(a=a, b=b, c=c, d=d, dt=dt, tau1=tau1, tau2=tau2, tau3=tau3)
+        for name in self._PARAMS:
+            setattr(self, name, np.broadcast_to(np.asarray(values[name], dtype=np.float64), (n,)).copy())
+
+        # Initial conditions
+        self.state = np.stack((seeds, seeds * 1.2, seeds * 1.5, seeds * 2.0), axis=1)
+
+        # Same truncation as int(tau / dt) in the scalar generator; every
+        # ring starts filled with its initial value
+        lens = np.stack([(tau / self.dt).astype(np.int64) + 1
+                         for tau in (self.tau1, self.tau2, self.tau3)], axis=1)
+        self._set_delays(lens, [np.repeat(self.state[:, i:i + 1], lens[:, i].max(), axis=1)
+                                for i in range(3)])
+
+        self.t = np.zeros(n, dtype=np.int64)
+
+    def _set_delays(self, lens, rings):
+        # Row s of delay line i uses its first lens[s, i] slots, oldest sample
+        # at t % lens[s, i]; shorter lines are padded to the longest one
+        n, width = len(lens), int(lens.max())
+        self.lens = lens
+        self.delay = np.zeros((n, 3, width), dtype=np.float64)
+        for i, ring in enumerate(rings):
+            self.delay[:, i, :ring.shape[1]] = ring
+        self._base = (np.arange(n) * 3 * width)[:, np.newaxis] + np.arange(3) * width
+
+    # Per-variable views (same names as the scalar generator)
+    x = property(lambda self: self.state[:, 0])
+    y = property(lambda self: self.state[:, 1])
+    z = property(lambda self: self.state[:, 2])
+    w = property(lambda self: self.state[:, 3])
+    x_delay = property(lambda self: self.delay[:, 0])
+    y_delay = property(lambda self: self.delay[:, 1])
+    z_delay = property(lambda self: self.delay[:, 2])
+    len1 = property(lambda self: self.lens[:, 0])
+    len2 = property(lambda self: self.lens[:, 1])
+    len3 = property(lambda self: self.lens[:, 2])
+
+    def __len__(self):
+        return len(self.state)
+
+    def step(self):
+        """
+        Advance every session one step; returns the (S, 4) states (the
+        ensemble's own array: copy it before modifying).
+        """
+        index = self._base + self.t[:, np.newaxis] % self.lens
+        flat = self.delay.reshape(-1)
+        x_tau, y_tau, z_tau = flat[index].T
+        x, y, z, w = self.state.T
+
+        # Same expressions and evaluation order as ChaosKeyGenerator.step.
+        # y**2 goes through libm pow like Python floats do (float_power);
+        # ndarray ** 2 squares instead and can differ in the last bit.
+        dx = -self.a * x_tau - self.b * y * z
+        dy = -x + self.c * y_tau + self.c * w
+        dz = self.d - np.float_power(y, 2) - z_tau
+        dw = x - w
+
+        # x += dx * dt for the four columns at once
+        self.state = self.state + np.stack((dx, dy, dz, dw), axis=1) * self.dt[:, np.newaxis]
+
+        flat[index] = self.state[:, :3]
+        self.t += 1
+        return self.state
+
+    def step_many(self, n):
+        """
+        Advance n steps; returns the visited states as an (n, S, 4) array.
+        """
+        out = np.empty((n, len(self), 4), dtype=np.float64)
+        for j in range(n):
+            out[j] = self.step()
+        return out
+
+    def get_state(self, s):
+        """
+        State of session s in the ChaosKeyGenerator.get_state() format.
+        """
+        state = {name: float(getattr(self, name)[s]) for name in self._PARAMS}
+        state.update(zip("xyzw", self.state[s].tolist()), t=int(self.t[s]))
+        for i, name in enumerate(("x_delay", "y_delay", "z_delay")):
+            state[name] = self.delay[s, i, :self.lens[s, i]].tolist()
+        return state
+
+    def generator(self, s):
+        # Scalar generator continuing session s
+        return ChaosKeyGenerator.from_state(self.get_state(s))
+
+    @classmethod
+    def from_generators(cls, generators):
+        """
+        Ensemble continuing the given scalar generators (one session each).
+        """
+        states = [g.get_state() for g in generators]
+        ensemble = cls(np.zeros(len(states)))
+        for name in cls._PARAMS + ("t",):
+            getattr(ensemble, name)[:] = [state[name] for state in states]
+        ensemble.state[:] = [[state[v] for v in "xyzw"] for state in states]
+
+        names = ("x_delay", "y_delay", "z_delay")
+        lens = np.array([[len(state[name]) for name in names] for state in states], dtype=np.int64)
+        rings = []
+        for i, name in enumerate(names):
+            ring = np.zeros((len(states), lens[:, i].max()), dtype=np.float64)
+            for s, state in enumerate(states):
+                ring[s, :lens[s, i]] = state[name]
+            rings.append(ring)
+        ensemble._set_delays(lens, rings)
+        return ensemble
+
+
+class StenfloEnsemble:
+    """
+    S independent Lorenz-Stenflo sessions (crypto.chaos_generator_stenflo)
+    advanced together; row s matches the scalar generator with seeds[s].
+    """
+
+    def __init__(self, seeds):
+        seeds = np.atleast_1d(np.asarray(seeds, dtype=np.float64))
+        self.x, self.y, self.z, self.w = seeds.copy(), seeds * 2, seeds * 3, seeds * 4
+
+    def __len__(self):
+        return len(self.x)
+
+    def step(self):
+        # Sequential updates: each line uses the values already updated above
+        a, b, c, d = 11.0, 2.9, 5.0, 23.0
+        self.x = a * (self.y - self.x) + self.z
+        self.y = d * self.x - self.y - self.x * self.w
+        self.z = -c * self.x - self.z
+        self.w = self.x * self.y - b * self.w
+        return np.stack((self.x, self.y, self.z, self.w), axis=1)
+
+    def step_many(self, n):
+        out = np.empty((n, len(self), 4), dtype=np.float64)
+        for j in range(n):
+            out[j] = self.step()
+        return out
+
+    def generate_keys(self, shape):
+        """
+        One generate_key(shape) per session as an (S,) + shape read-only
+        view (each scalar key is a constant array).
+        """
+        chaos = np.abs(np.sin(self.step()))
+        # Explicit left-to-right sum: same rounding as the scalar 4-element mean
+        mean = (((chaos[:, 0] + chaos[:, 1]) + chaos[:, 2]) + chaos[:, 3]) / 4
+        values = (mean * 255).astype(np.uint8)
+        shape = tuple(np.atleast_1d(shape))
+        return np.broadcast_to(values.reshape((-1,) + (1,) * len(shape)), (len(self),) + shape)
+
+    def generator(self, s):
+        gen = StenfloGenerator()
+        gen.x, gen.y, gen.z, gen.w = float(self.x[s]), float(self.y[s]), float(self.z[s]), float(self.w[s])
+        return gen
+
+    @classmethod
+    def from_generators(cls, generators):
+        ensemble = cls(np.zeros(len(generators)))
+        for name in ("x", "y", "z", "w"):
+            getattr(ensemble, name)[:] = [getattr(g, name) for g in generators]
+        return ensemble
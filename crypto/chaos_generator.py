@@ -1,5 +1,5 @@
 import numpy as np
-from collections import deque
+import copy
 
 class ChaosKeyGenerator:
     """
@@ -30,15 +30,23 @@ class ChaosKeyGenerator:
         self.z = seed * 1.5
         self.w = seed * 2.0
 
-        # Delay buffers
-        self.x_delay = deque([self.x] * (self.delay1 + 1), maxlen=self.delay1 + 1)
-        self.y_delay = deque([self.y] * (self.delay2 + 1), maxlen=self.delay2 + 1)
-        self.z_delay = deque([self.z] * (self.delay3 + 1), maxlen=self.delay3 + 1)
+        # Delay buffers (fixed-size ring buffers, the oldest sample sits at
+        # index t % len)
+        self.x_delay = [self.x] * (self.delay1 + 1)
+        self.y_delay = [self.y] * (self.delay2 + 1)
+        self.z_delay = [self.z] * (self.delay3 + 1)
+
+        # Number of steps taken since the initial conditions
+        self.t = 0
 
     def step(self):
-        x_tau = self.x_delay[0]
-        y_tau = self.y_delay[0]
-        z_tau = self.z_delay[0]
+        i1 = self.t % len(self.x_delay)
+        i2 = self.t % len(self.y_delay)
+        i3 = self.t % len(self.z_delay)
+
+        x_tau = self.x_delay[i1]
+        y_tau = self.y_delay[i2]
+        z_tau = self.z_delay[i3]
 
         dx = -self.a * x_tau - self.b * self.y * self.z
         dy = -self.x + self.c * y_tau + self.c * self.w
@@ -50,8 +58,103 @@ class ChaosKeyGenerator:
         self.z += dz * self.dt
         self.w += dw * self.dt
 
-        self.x_delay.append(self.x)
-        self.y_delay.append(self.y)
-        self.z_delay.append(self.z)
+        self.x_delay[i1] = self.x
+        self.y_delay[i2] = self.y
+        self.z_delay[i3] = self.z
+        self.t += 1
 
         return self.x, self.y, self.z, self.w
+
+    def step_many(self, n):
+        """
+        Advance n steps and return the visited states as an (n, 4) float64
+        array. Bit-identical to calling step() n times.
+        """
+        a, b, c, d, dt = self.a, self.b, self.c, self.d, self.dt
+        x, y, z, w = self.x, self.y, self.z, self.w
+
+        # Unroll the ring buffers oldest-first; the delayed sample for step j
+        # is then simply element j and the history doubles as the output
+        n1, n2, n3 = len(self.x_delay), len(self.y_delay), len(self.z_delay)
+        xh = _unroll(self.x_delay, self.t % n1)
+        yh = _unroll(self.y_delay, self.t % n2)
+        zh = _unroll(self.z_delay, self.t % n3)
+        wh = []
+        x_app, y_app, z_app, w_app = xh.append, yh.append, zh.append, wh.append
+
+        for j in range(n):
+            dx = -a * xh[j] - b * y * z
+            dy = -x + c * yh[j] + c * w
+            dz = d - y**2 - zh[j]
+            dw = x - w
+
+            x += dx * dt
+            y += dy * dt
+            z += dz * dt
+            w += dw * dt
+
+            x_app(x)
+            y_app(y)
+            z_app(z)
+            w_app(w)
+
+        self.x, self.y, self.z, self.w = x, y, z, w
+        self.t += n
+        self.x_delay = _roll(xh[-n1:], self.t % n1)
+        self.y_delay = _roll(yh[-n2:], self.t % n2)
+        self.z_delay = _roll(zh[-n3:], self.t % n3)
+
+        out = np.empty((n, 4), dtype=np.float64)
+        out[:, 0] = xh[n1:]
+        out[:, 1] = yh[n2:]
+        out[:, 2] = zh[n3:]
+        out[:, 3] = wh
+        return out
+
+    def trajectory(self, n):
+        """
+        Next n states as an (n, 4) array without advancing this generator
+        (key lookahead).
+        """
+        return copy.deepcopy(self).step_many(n)
+
+    _STATE_FIELDS = ("a", "b", "c", "d", "dt", "tau1", "tau2", "tau3",
+                     "x", "y", "z", "w", "t")
+
+    def get_state(self):
+        """
+        Full generator state (parameters, x/y/z/w, step counter and the three
+        delay lines) as a JSON-serializable dict.
+        """
+        state = {name: getattr(self, name) for name in self._STATE_FIELDS}
+        state["x_delay"] = list(self.x_delay)
+        state["y_delay"] = list(self.y_delay)
+        state["z_delay"] = list(self.z_delay)
+        return state
+
+    def set_state(self, state):
+        for name in self._STATE_FIELDS:
+            setattr(self, name, state[name])
+        self.x_delay = [float(v) for v in state["x_delay"]]
+        self.y_delay = [float(v) for v in state["y_delay"]]
+        self.z_delay = [float(v) for v in state["z_delay"]]
+        self.delay1 = len(self.x_delay) - 1
+        self.delay2 = len(self.y_delay) - 1
+        self.delay3 = len(self.z_delay) - 1
+
+    @classmethod
+    def from_state(cls, state):
+        gen = cls(dt=state["dt"])
+        gen.set_state(state)
+        return gen
+
+
+def _unroll(ring, head):
+    # Ring buffer -> list ordered oldest-first
+    return ring[head:] + ring[:head]
+
+
+def _roll(history, head):
+    # Oldest-first list -> ring buffer whose oldest sample sits at head
+    split = len(history) - head
+    return history[split:] + history[:split]
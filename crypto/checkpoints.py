@@ -0,0 +1,58 @@
+import json
+
+
+class CheckpointWriter:
+    """
+    Writes the encryptor state every `interval` frames to a JSON-lines index
+    next to the ciphertext. The file is flushed after each checkpoint so an
+    interrupted run can still be resumed.
+    """
+
+    def __init__(self, path, interval=300):
+        self.path = path
+        self.interval = interval
+        self.f = open(path, 'w')
+        self.f.write(json.dumps({'interval': interval}) + '\n')
+        self.f.flush()
+
+    def record(self, frame_id, encryptor):
+        # Must be called before frame `frame_id` is encrypted
+        if frame_id % self.interval != 0:
+            return
+        entry = {'frame': frame_id, 'state': encryptor.get_state()}
+        self.f.write(json.dumps(entry) + '\n')
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def load_checkpoints(path):
+    """
+    Returns (interval, {frame_id: state}).
+    """
+    with open(path) as f:
+        interval = json.loads(f.readline())['interval']
+        checkpoints = {}
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            checkpoints[entry['frame']] = entry['state']
+    return interval, checkpoints
+
+
+def seek(encryptor, checkpoints, frame_id):
+    """
+    Positions `encryptor` so that its next encrypt/decrypt call handles
+    frame `frame_id`: restores the closest checkpoint at or before it and
+    replays the remaining (at most interval - 1) chaos steps.
+    """
+    candidates = [f for f in checkpoints if f <= frame_id]
+    if not candidates:
+        raise ValueError(f"No hay checkpoint anterior al frame {frame_id}")
+    start = max(candidates)
+    encryptor.set_state(checkpoints[start])
+    encryptor.skip(frame_id - start)
+    return start
@@ -2,13 +2,39 @@ import numpy as np
 from Crypto.Cipher import AES
 from Crypto.Hash import SHA3_256
 import struct
+from crypto.parallel_ctr import ParallelCTR
+from utils.timer import StageProfiler
+
+# magic, M, N, A, estado caótico (x, y, z, w) = 4 + 4 + 4 + 4 + 32 bytes
+_HEADER = struct.Struct('<4sIII4d')
+
+
+def _buffer(size, out=None):
+    # Buffer de trabajo: el del llamador (reutilizable) o uno nuevo sin
+    # inicializar
+    if out is None:
+        return memoryview(np.empty(size, dtype=np.uint8))
+    buf = memoryview(out).cast('B')
+    if len(buf) < size:
+        raise ValueError(f"Buffer de {len(buf)} bytes, se requieren {size}")
+    return buf[:size]
 
 
 class MNAKFrameEncryptor:
-    def __init__(self, chaos_generator, audio_samples_per_frame=0):
+    def __init__(self, chaos_generator, audio_samples_per_frame=0, mode='cfb', workers=None,
+                 profiler=None):
         self.chaos = chaos_generator
         self.audio_samples_per_frame = audio_samples_per_frame
         self.frame_count = 0
+
+        # Tiempos de derivación de clave, serialización y AES (opcional)
+        self.profiler = profiler if profiler is not None else StageProfiler(enabled=False)
+
+        # 'cfb' (secuencial, por defecto) o 'ctr' (rangos en paralelo)
+        if mode not in ('cfb', 'ctr'):
+            raise ValueError(f"Modo de cifrado no soportado: {mode}")
+        self.mode = mode
+        self.ctr = ParallelCTR(workers) if mode == 'ctr' else None
         
     def _get_chaos_state(self):
         x, y, z, w = self.chaos.step()
@@ -29,90 +55,121 @@ class MNAKFrameEncryptor:
         # Primeros 16 bytes = key, siguientes 16 bytes = IV
         return key_material[:16], key_material[16:32]
     
-    def _serialize_mnak(self, frame, audio_chunk, chaos_state):
+    def record_size(self, frame, audio_chunk=None):
+        """
+        Tamaño en bytes del registro M×N×A×K (y de su ciphertext).
+        """
+        audio_bytes = audio_chunk.nbytes if audio_chunk is not None else 0
+        return _HEADER.size + frame.nbytes + audio_bytes
+
+    def _serialize_mnak(self, frame, audio_chunk, chaos_state, out=None):
         # Dimensiones
         M, N, channels = frame.shape
         A = len(audio_chunk) if audio_chunk is not None else 0
-        # header (4 + 4 + 4 + 4 + 32 bytes)  
-        header = bytearray()
-        header.extend(b'MNAK')  # Magic number
-        header.extend(struct.pack('<I', M))
-        header.extend(struct.pack('<I', N))
-        header.extend(struct.pack('<I', A))
-        header.extend(np.array(chaos_state, dtype=np.float64).tobytes())
-        
-        # Datos del frame (M×N×3 bytes)
-        frame_bytes = frame.tobytes()
-        
+        buf = _buffer(self.record_size(frame, audio_chunk), out)
+
+        # header (4 + 4 + 4 + 4 + 32 bytes)
+        _HEADER.pack_into(buf, 0, b'MNAK', M, N, A, *chaos_state)
+
+        # Datos del frame (M×N×3 bytes), escritos directamente en el buffer
+        offset = _HEADER.size
+        np.frombuffer(buf, dtype=np.uint8, count=frame.size, offset=offset).reshape(frame.shape)[...] = frame
+        offset += frame.nbytes
+
         # Datos de audio (A bytes si audio es int16, o A*4 si float32)
-        if audio_chunk is not None and len(audio_chunk) > 0:
-            audio_bytes = audio_chunk.tobytes()
-        else:
-            audio_bytes = b''
-        
-        # Concatenar todo
-        return bytes(header) + frame_bytes + audio_bytes
+        if A > 0:
+            np.frombuffer(buf, dtype=audio_chunk.dtype, count=A, offset=offset)[:] = audio_chunk
+
+        return buf
     
     def _deserialize_mnak(self, data_bytes):
+        # Devuelve vistas sobre data_bytes, sin copias
 
         # Leer header (48 bytes)
-        magic = data_bytes[0:4]
+        magic, M, N, A, *chaos_state = _HEADER.unpack_from(data_bytes, 0)
         if magic != b'MNAK':
             raise ValueError(f"Magic number inválido: {magic}")
-        
-        M = struct.unpack('<I', data_bytes[4:8])[0]
-        N = struct.unpack('<I', data_bytes[8:12])[0]
-        A = struct.unpack('<I', data_bytes[12:16])[0]
-        
-        chaos_state = np.frombuffer(data_bytes[16:48], dtype=np.float64)
         chaos_state = tuple(chaos_state)
         
         # Leer frame (después del header)
         frame_size = M * N * 3
-        frame_start = 48
-        frame_end = frame_start + frame_size
-        frame_bytes = data_bytes[frame_start:frame_end]
-        frame = np.frombuffer(frame_bytes, dtype=np.uint8).reshape((M, N, 3))
+        frame_start = _HEADER.size
+        frame = np.frombuffer(data_bytes, dtype=np.uint8, count=frame_size,
+                              offset=frame_start).reshape((M, N, 3))
         
-        # Leer audio (después del frame)
+        # Leer audio (después del frame), int16 = 2 bytes por muestra
         if A > 0:
-            audio_start = frame_end
-            audio_end = audio_start + A * 2  # int16 = 2 bytes por muestra
-            audio_bytes = data_bytes[audio_start:audio_end]
-            audio_chunk = np.frombuffer(audio_bytes, dtype=np.int16)
+            audio_chunk = np.frombuffer(data_bytes, dtype=np.int16, count=A,
+                                        offset=frame_start + frame_size)
         else:
             audio_chunk = None
         
         return frame, audio_chunk, chaos_state, M, N, A
     
-    def encrypt(self, frame, audio_chunk=None):
-
-        # Obtener estado caótico actual (dimensión K)
-        chaos_state = self._get_chaos_state()
-        
-        # Serializar M×N×A×K a bytes
-        plaintext = self._serialize_mnak(frame, audio_chunk, chaos_state)
-        
-        # Derivar clave e IV desde K
-        key, iv = self._derive_key_iv_from_chaos(chaos_state)
-        
-        # Encriptar con AES-CFB
-        cipher = AES.new(key, AES.MODE_CFB, iv=iv, segment_size=128)
-        ciphertext = cipher.encrypt(plaintext)
-        
-        return ciphertext
+    def prepare(self, frame, audio_chunk=None, out=None):
+        """
+        Parte secuencial de encrypt(): avanza el caos, serializa y deriva
+        key/IV. Devuelve (key, iv, plaintext) para cifrar en otro proceso.
+        """
+        with self.profiler.stage("derivación de clave"):
+            # Obtener estado caótico actual (dimensión K)
+            chaos_state = self._get_chaos_state()
+            
+            # Derivar clave e IV desde K
+            key, iv = self._derive_key_iv_from_chaos(chaos_state)
+        
+        with self.profiler.stage("serialización"):
+            # Serializar M×N×A×K en un único buffer
+            plaintext = self._serialize_mnak(frame, audio_chunk, chaos_state, out)
+        
+        return key, iv, plaintext
     
-    def decrypt(self, ciphertext):
-
+    def encrypt(self, frame, audio_chunk=None, out=None):
+        """
+        Cifra in situ sobre el buffer serializado. Con `out` (de al menos
+        record_size() bytes) el mismo buffer se reutiliza entre frames; el
+        resultado es una vista sobre él.
+        """
+        return self.encrypt_prepared(*self.prepare(frame, audio_chunk, out))
+    
+    def encrypt_prepared(self, key, iv, plaintext):
+        # Parte AES de encrypt(), in situ; puede correr en otro hilo
+        with self.profiler.stage("AES"):
+            if self.ctr is not None:
+                return self.ctr.crypt(key, iv, plaintext, plaintext)
+            cipher = AES.new(key, AES.MODE_CFB, iv=iv, segment_size=128)
+            cipher.encrypt(plaintext, output=plaintext)
+        
+        return plaintext
+    
+    def prepare_decrypt(self, ciphertext):
+        """
+        Parte secuencial de decrypt(): avanza el caos y deriva key/IV. El
+        resultado se pasa a decrypt_prepared(), que puede correr en otro hilo.
+        """
         # Obtener estado caótico actual (debe estar sincronizado con encriptación)
         chaos_state = self._get_chaos_state()
         
         # Derivar la misma clave e IV
         key, iv = self._derive_key_iv_from_chaos(chaos_state)
         
+        return key, iv, ciphertext, chaos_state, self.frame_count
+    
+    def decrypt(self, ciphertext, out=None):
+        """
+        Frame y audio se devuelven como vistas sobre el buffer de salida
+        (`out` si se pasa; puede ser el propio ciphertext si es escribible).
+        """
+        return self.decrypt_prepared(*self.prepare_decrypt(ciphertext), out=out)
+    
+    def decrypt_prepared(self, key, iv, ciphertext, chaos_state, frame_count, out=None):
         # Desencriptar
-        cipher = AES.new(key, AES.MODE_CFB, iv=iv, segment_size=128)
-        plaintext = cipher.decrypt(ciphertext)
+        plaintext = _buffer(len(memoryview(ciphertext).cast('B')), out)
+        if self.ctr is not None:
+            self.ctr.crypt(key, iv, ciphertext, plaintext)
+        else:
+            cipher = AES.new(key, AES.MODE_CFB, iv=iv, segment_size=128)
+            cipher.decrypt(ciphertext, output=plaintext)
         
         # Deserializar M×N×A×K
         frame, audio_chunk, stored_chaos_state, M, N, A = self._deserialize_mnak(plaintext)
@@ -120,12 +177,27 @@ class MNAKFrameEncryptor:
         # Verificar que el estado caótico coincida (validación de integridad)
         chaos_diff = np.array(chaos_state) - np.array(stored_chaos_state)
         if np.max(np.abs(chaos_diff)) > 1e-6:
-            print(f"Advertencia: Estado caótico no coincide en frame {self.frame_count}")
+            print(f"Advertencia: Estado caótico no coincide en frame {frame_count}")
             print(f"Esperado: {chaos_state}")
             print(f"Obtenido: {stored_chaos_state}")
         
         return frame, audio_chunk
     
+    def get_state(self):
+        return {
+            'frame_count': self.frame_count,
+            'chaos': self.chaos.get_state(),
+        }
+
+    def set_state(self, state):
+        self.frame_count = state['frame_count']
+        self.chaos.set_state(state['chaos'])
+
+    def skip(self, n_frames):
+        # Avanzar n frames sin cifrar (un paso caótico por frame)
+        self.chaos.step_many(n_frames)
+        self.frame_count += n_frames
+
     def get_state_info(self):
         return {
             'frame_count': self.frame_count,
@@ -0,0 +1,151 @@
+import multiprocessing as mp
+import os
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+from Crypto.Cipher import AES
+
+
+def _worker(tasks, done):
+    shm = None
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        seq, shm_name, offset, length, key, iv, mode = task
+        try:
+            if shm is None or shm.name != shm_name:
+                if shm is not None:
+                    shm.close()
+                shm = shared_memory.SharedMemory(name=shm_name)
+            buf = shm.buf[offset:offset + length]
+            if mode == 'ctr':
+                cipher = AES.new(key, AES.MODE_CTR, nonce=b'', initial_value=iv)
+            else:
+                cipher = AES.new(key, AES.MODE_CFB, iv=iv, segment_size=128)
+            cipher.encrypt(buf, output=buf)  # in place, inside the slot
+            buf.release()
+            done.put((seq, None))
+        except Exception as e:
+            done.put((seq, repr(e)))
+    if shm is not None:
+        shm.close()
+
+
+class ProcessPoolEncryptionEngine:
+    """
+    Key/IV derivation stays on the coordinator, in frame order, through
+    encryptor.prepare(); the AES work runs on a pool of worker processes.
+    Plaintexts are copied into a shared-memory ring of `n_slots` slots and
+    encrypted in place, so frames are never pickled. Works with any encryptor
+    exposing prepare() and `mode` (AESCFBFrameEncryptor, AESCTRFrameEncryptor,
+    MNAKFrameEncryptor) and produces the same bytes as encryptor.encrypt().
+    """
+
+    def __init__(self, encryptor, workers=None, n_slots=None, slot_size=None):
+        self.encryptor = encryptor
+        self.workers = workers or os.cpu_count() or 1
+        self.n_slots = n_slots or 2 * self.workers
+        self.slot_size = slot_size
+        self.shm = None
+
+        # Workers must share the coordinator's resource tracker, otherwise each
+        # one would report the ring as leaked when it exits
+        resource_tracker.ensure_running()
+        ctx = mp.get_context()
+        self.tasks = ctx.Queue()
+        self.done = ctx.Queue()
+        self.procs = [ctx.Process(target=_worker, args=(self.tasks, self.done), daemon=True)
+                      for _ in range(self.workers)]
+        for p in self.procs:
+            p.start()
+
+    def _slot(self, seq, length):
+        offset = (seq % self.n_slots) * self.slot_size
+        return offset, self.shm.buf[offset:offset + length]
+
+    def _submit(self, seq, key, iv, plaintext):
+        if isinstance(plaintext, np.ndarray):
+            meta = (plaintext.shape,)
+            data = np.ascontiguousarray(plaintext).view(np.uint8).reshape(-1)
+        else:
+            meta = None
+            data = np.frombuffer(plaintext, dtype=np.uint8)
+
+        if self.shm is None:
+            self.slot_size = self.slot_size or data.nbytes
+            self.shm = shared_memory.SharedMemory(create=True, size=self.slot_size * self.n_slots)
+        if data.nbytes > self.slot_size:
+            raise ValueError(f"Plaintext of {data.nbytes} bytes exceeds the slot size ({self.slot_size})")
+
+        offset, view = self._slot(seq, data.nbytes)
+        np.frombuffer(view, dtype=np.uint8)[:] = data
+        view.release()
+        self.tasks.put((seq, self.shm.name, offset, data.nbytes, key, iv, self.encryptor.mode))
+        return data.nbytes, meta
+
+    def _collect(self, seq, length, meta):
+        _, view = self._slot(seq, length)
+        if meta is None:
+            out = bytes(view)
+        else:
+            out = np.frombuffer(bytes(view), dtype=np.uint8).reshape(meta[0])
+        view.release()
+        return out
+
+    def imap(self, jobs):
+        """
+        jobs: iterable of argument tuples for encryptor.prepare(), e.g.
+        (frame,) or (frame, audio_chunk). Yields (job, ciphertext) in input
+        order.
+        """
+        inflight = {}
+        completed = set()
+        seq = 0
+        next_out = 0
+
+        def wait_next(block):
+            while next_out not in completed:
+                if not block and self.done.empty():
+                    return False
+                done_seq, error = self.done.get()
+                if error is not None:
+                    raise RuntimeError(f"Error encrypting frame {done_seq}: {error}")
+                completed.add(done_seq)
+            return True
+
+        for job in jobs:
+            # Slot seq is reused once seq - n_slots has been yielded
+            while seq - next_out >= self.n_slots or (next_out < seq and wait_next(False)):
+                wait_next(True)
+                job_out, length, meta = inflight.pop(next_out)
+                completed.discard(next_out)
+                yield job_out, self._collect(next_out, length, meta)
+                next_out += 1
+
+            key, iv, plaintext = self.encryptor.prepare(*job)
+            length, meta = self._submit(seq, key, iv, plaintext)
+            inflight[seq] = (job, length, meta)
+            seq += 1
+
+        while next_out < seq:
+            wait_next(True)
+            job_out, length, meta = inflight.pop(next_out)
+            completed.discard(next_out)
+            yield job_out, self._collect(next_out, length, meta)
+            next_out += 1
+
+    def close(self):
+        for _ in self.procs:
+            self.tasks.put(None)
+        for p in self.procs:
+            p.join()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -9,3 +9,25 @@ class SDKGenerator:
         x, y, z, w = self.chaos.step()
         chaos_state = np.array([x, y, z, w], dtype=np.float64).tobytes()
         return SHA3_256.new(chaos_state).digest()
+
+
+def digest_states(states):
+    """
+    SDKGenerator.generate() digest of each row of an (S, 4) array of chaos
+    states (e.g. one ChaosEnsemble step).
+    """
+    states = np.ascontiguousarray(states, dtype=np.float64)
+    return [SHA3_256.new(row.tobytes()).digest() for row in states]
+
+
+class SDKEnsemble:
+    """
+    SDKGenerator for every session of a ChaosEnsemble: one vectorized chaos
+    step per tick, then one digest per session.
+    """
+
+    def __init__(self, ensemble):
+        self.chaos = ensemble
+
+    def generate(self):
+        return digest_states(self.chaos.step())
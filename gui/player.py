@@ -0,0 +1,125 @@
+# gui/player.py
+"""
+Reproductor en tiempo real de streams cifrados.
+
+Un hilo deriva las claves en orden (prepare_decrypt) y envía el AES de cada
+frame a un pool de hilos; los futures quedan en una cola acotada (prefetch)
+que el hilo principal consume al ritmo de los fps almacenados.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+_END = object()
+
+
+class PrefetchPlayer:
+    def __init__(self, records, decryptor, fps, prefetch=16, workers=4):
+        self.records = records
+        self.decryptor = decryptor
+        self.fps = fps
+        self.prefetch = prefetch
+        self.workers = workers
+        self.stop = threading.Event()
+        self.error = None
+
+    def _produce(self, pool, pending):
+        try:
+            for ciphertext in self.records:
+                if len(ciphertext) == 0:
+                    # frame descartado al cifrar en tiempo real: solo avanza las claves
+                    self.decryptor.skip(1)
+                    future = Future()
+                    future.set_result(None)
+                else:
+                    job = self.decryptor.prepare_decrypt(ciphertext)
+                    future = pool.submit(self.decryptor.decrypt_prepared, *job)
+                while not self.stop.is_set():
+                    try:
+                        pending.put(future, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if self.stop.is_set():
+                    return
+        except BaseException as exc:
+            # el consumidor la relanza al llegar a _END
+            self.error = exc
+        finally:
+            pending.put(_END)
+
+    def play(self, present):
+        """
+        Llama present(frame) para cada frame a tiempo; present puede devolver
+        False para detener la reproducción. Un frame que llega con más de un
+        periodo de retraso se descarta (no se presenta) para recuperar el
+        ritmo; los que llegan con menos retraso se cuentan como tardíos.
+
+        El descifrado va por delante del reloj (prefetch), así que un frame
+        descartado ya se ha descifrado: descartar recupera el ritmo de
+        presentación, no trabajo de AES. Un error del hilo productor (lectura
+        o derivación de claves) se relanza aquí.
+        """
+        period = 1.0 / self.fps
+        pending = queue.Queue(self.prefetch)
+        stats = {"shown": 0, "late": 0, "dropped": 0, "missing": 0}
+        lateness = []
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            producer = threading.Thread(target=self._produce, args=(pool, pending), daemon=True)
+            producer.start()
+
+            start = None
+            index = 0
+            try:
+                while True:
+                    future = pending.get()
+                    if future is _END:
+                        if self.error is not None:
+                            raise self.error
+                        break
+                    result = future.result()
+                    frame = result[0] if isinstance(result, tuple) else result
+
+                    now = time.perf_counter()
+                    if start is None:
+                        start = now  # el reloj arranca con el primer frame
+                    deadline = start + index * period
+                    index += 1
+
+                    if frame is None:
+                        stats["missing"] += 1
+                        continue
+
+                    delay = now - deadline
+                    if delay > period:
+                        stats["dropped"] += 1
+                        continue
+                    if delay > 0:
+                        stats["late"] += 1
+                        lateness.append(delay)
+                    else:
+                        time.sleep(-delay)
+
+                    stats["shown"] += 1
+                    if present(frame) is False:
+                        break
+            finally:
+                self.stop.set()
+                while producer.is_alive():
+                    try:
+                        pending.get_nowait()
+                    except queue.Empty:
+                        producer.join(0.05)
+
+        elapsed = time.perf_counter() - start if start is not None else 0.0
+        stats["frames"] = index
+        stats["elapsed_s"] = elapsed
+        stats["effective_fps"] = stats["shown"] / elapsed if elapsed > 0 else 0.0
+        stats["max_late_ms"] = 1e3 * max(lateness) if lateness else 0.0
+        stats["mean_late_ms"] = 1e3 * float(np.mean(lateness)) if lateness else 0.0
+        return stats
@@ -2,54 +2,117 @@ import cv2
 from config.settings import *
 from crypto.chaos_generator import ChaosKeyGenerator
 from crypto.aes_encryptor import AESCFBFrameEncryptor
+from crypto.checkpoints import CheckpointWriter
+from crypto.process_engine import ProcessPoolEncryptionEngine
 from video.video_io import open_video, create_writer
+from video.raw_sink import RawCipherWriter
 from gui.viewer import show_frames
-from utils.timer import Timer
+from utils.timer import Timer, StageProfiler
+from utils.pipeline import Pipeline, map_stage
 
-cap = open_video(VIDEO_INPUT)
-writer_enc = create_writer(VIDEO_ENCRYPTED, FPS, (FRAME_WIDTH, FRAME_HEIGHT))
-writer_dec = create_writer(VIDEO_DECRYPTED, FPS, (FRAME_WIDTH, FRAME_HEIGHT))
 
-seed = 0.1
-warmup = 1000
+def main():
+    cap = open_video(VIDEO_INPUT)
+    writer_dec = create_writer(VIDEO_DECRYPTED, FPS, (FRAME_WIDTH, FRAME_HEIGHT))
 
-keygen_enc = ChaosKeyGenerator(seed=seed)
-keygen_dec = ChaosKeyGenerator(seed=seed)
+    seed = 0.1
+    warmup = 1000
 
-for _ in range(warmup):
-    keygen_enc.step()
-    keygen_dec.step()
+    keygen_enc = ChaosKeyGenerator(seed=seed)
+    keygen_dec = ChaosKeyGenerator(seed=seed)
 
-encryptor = AESCFBFrameEncryptor(keygen_enc)
-decryptor = AESCFBFrameEncryptor(keygen_dec)
+    keygen_enc.step_many(warmup)
+    keygen_dec.step_many(warmup)
 
-timer = Timer()
-total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-frame_id = 0
+    encryptor = AESCFBFrameEncryptor(keygen_enc)
+    decryptor = AESCFBFrameEncryptor(keygen_dec)
+    writer_enc = RawCipherWriter(VIDEO_ENCRYPTED_RAW, FRAME_WIDTH, FRAME_HEIGHT, FPS, encryptor.mode,
+                                 preview_path=VIDEO_ENCRYPTED, preview_every=PREVIEW_EVERY)
+    checkpoints = CheckpointWriter(VIDEO_ENCRYPTED_RAW + ".ckpt", CHECKPOINT_INTERVAL)
 
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
+    profiler = StageProfiler()
+    timer = Timer()
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
-    frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
+    def read_frames():
+        while cap.isOpened():
+            with profiler.stage("decodificación"):
+                ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
 
-    encrypted = encryptor.encrypt(frame)
-    decrypted = decryptor.decrypt(encrypted)
+    def resize(frame):
+        with profiler.stage("redimensión"):
+            return cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
 
-    writer_enc.write(encrypted)
-    writer_dec.write(decrypted)
+    def encrypt_frames(frames):
+        # Un solo hilo deriva las claves, en orden de frame
+        def jobs():
+            for frame_id, frame in enumerate(frames):
+                checkpoints.record(frame_id, encryptor)
+                yield (frame,)
 
-    progress = (frame_id / total_frames) * 100
-    info = f"Frame {frame_id}/{total_frames} | {progress:.1f}% | {timer.elapsed():.1f}s"
+        if engine is not None:
+            # Con workers el AES corre en otros procesos y no aparece en el perfil
+            return engine.imap(jobs())
+        return ((job, encrypt(*job)) for job in jobs())
 
-    show_frames(frame, encrypted, decrypted, info)
+    def encrypt(frame):
+        with profiler.stage("derivación de clave"):
+            key, iv, frame = encryptor.prepare(frame)
+        with profiler.stage("AES"):
+            return encryptor.encrypt_prepared(key, iv, frame)
 
-    frame_id += 1
-    if cv2.waitKey(1) & 0xFF == 27:
-        break
+    def decrypt(item):
+        (frame,), encrypted = item
+        with profiler.stage("descifrado"):
+            return frame, encrypted, decryptor.decrypt(encrypted)
 
-cap.release()
-writer_enc.release()
-writer_dec.release()
-cv2.destroyAllWindows()
+    def write(item):
+        frame, encrypted, decrypted = item
+        with profiler.stage("escritura"):
+            writer_enc.write(encrypted)
+            writer_dec.write(decrypted)
+        return item
+
+    if ENCRYPT_WORKERS > 0:
+        engine = ProcessPoolEncryptionEngine(encryptor, workers=ENCRYPT_WORKERS)
+    else:
+        engine = None
+
+    pipeline = Pipeline(read_frames(), [
+        map_stage(resize),
+        encrypt_frames,
+        map_stage(decrypt),
+        map_stage(write),
+    ], maxsize=PIPELINE_QUEUE_SIZE)
+
+    frame_id = 0
+    for frame, encrypted, decrypted in pipeline:
+        progress = (frame_id / total_frames) * 100
+        info = f"Frame {frame_id}/{total_frames} | {progress:.1f}% | {timer.elapsed():.1f}s"
+
+        with profiler.stage("GUI"):
+            show_frames(frame, encrypted, decrypted, info)
+            key = cv2.waitKey(1) & 0xFF
+
+        frame_id += 1
+        if key == 27:
+            break
+
+    pipeline.close()
+    if engine is not None:
+        engine.close()
+    cap.release()
+    writer_enc.release()
+    writer_dec.release()
+    checkpoints.close()
+    cv2.destroyAllWindows()
+
+    profiler.report()
+    profiler.save(STAGE_PROFILE)
+
+
+if __name__ == "__main__":
+    main()
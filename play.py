@@ -0,0 +1,71 @@
+"""
+play.py
+Reproduce en tiempo real un contenedor MNAK (.mnak) o un stream cifrado
+crudo (.raw), descifrando por adelantado en hilos.
+
+Uso:
+    python play.py [--input FILE] [--prefetch N] [--workers N] [--headless]
+"""
+
+import argparse
+import sys
+
+from config.settings import *
+from crypto.chaos_generator import ChaosKeyGenerator
+from crypto.mnk_encryptor import MNAKFrameEncryptor
+from crypto.aes_encryptor import AESCFBFrameEncryptor, AESCTRFrameEncryptor
+from video.mnak_container import MNAKContainerReader
+from video.raw_sink import RawCipherReader
+from gui.player import PrefetchPlayer
+
+
+def open_stream(path, seed, warmup):
+    keygen = ChaosKeyGenerator(seed=seed)
+    keygen.step_many(warmup)
+    if path.endswith(".raw"):
+        reader = RawCipherReader(path)
+        cls = AESCTRFrameEncryptor if reader.mode == "ctr" else AESCFBFrameEncryptor
+        return reader, cls(keygen)
+    return MNAKContainerReader(path), MNAKFrameEncryptor(keygen)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproductor de video cifrado")
+    parser.add_argument("--input", default=MNAK_CONTAINER)
+    parser.add_argument("--seed", type=float, default=0.1)
+    parser.add_argument("--warmup", type=int, default=1000)
+    parser.add_argument("--prefetch", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--headless", action="store_true",
+                        help="no muestra ventana; solo mide el ritmo alcanzable")
+    args = parser.parse_args(argv)
+
+    reader, decryptor = open_stream(args.input, args.seed, args.warmup)
+    player = PrefetchPlayer(reader, decryptor, reader.fps,
+                            prefetch=args.prefetch, workers=args.workers)
+
+    if args.headless:
+        present = lambda frame: True
+    else:
+        import cv2
+
+        def present(frame):
+            cv2.imshow("Decrypted", frame)
+            return (cv2.waitKey(1) & 0xFF) != 27
+
+    try:
+        stats = player.play(present)
+    finally:
+        if not args.headless:
+            cv2.destroyAllWindows()
+
+    print(f"Frames: {stats['frames']} | mostrados {stats['shown']} | "
+          f"tardíos {stats['late']} | descartados {stats['dropped']} | "
+          f"ausentes {stats['missing']}")
+    print(f"fps objetivo {reader.fps:.2f} | fps efectivos {stats['effective_fps']:.2f} | "
+          f"retraso medio {stats['mean_late_ms']:.2f} ms | máx {stats['max_late_ms']:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
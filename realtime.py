@@ -0,0 +1,139 @@
+"""
+realtime.py
+Modo de tiempo real para fuentes en vivo, con presupuesto de latencia por
+frame (1/FPS) y política ante sobrecarga:
+
+    drop          si un frame llega tarde más allá del presupuesto no se cifra;
+                  se escribe un registro vacío y el cifrador avanza un frame
+                  (skip), así el contador de frame que MNAKFrameEncryptor mezcla
+                  en la clave sigue sincronizado con el descifrador
+    skip-preview  todos los frames se cifran; si se excede el presupuesto se
+                  omite la previsualización (descifrado + ventana)
+
+Un archivo de entrada se reproduce al ritmo de FPS como si fuera en vivo.
+
+Uso:
+    python realtime.py [--input FILE | --camera N] [--policy drop|skip-preview] [--headless]
+"""
+
+import argparse
+import sys
+import time
+
+import cv2
+
+from config.settings import *
+from crypto.chaos_generator import ChaosKeyGenerator
+from crypto.mnk_encryptor import MNAKFrameEncryptor
+from crypto.checkpoints import CheckpointWriter
+from video.video_io import open_video
+from video.mnak_container import MNAKContainerWriter
+from utils.realtime import DeadlineBudget
+
+
+def live_frames(cap, fps, paced):
+    """
+    Genera (frame, instante de llegada). Para archivos (`paced`) la llegada
+    del frame i es t0 + i/fps y se espera hasta entonces. Para cámaras la
+    llegada sale de la marca de captura del frame (CAP_PROP_POS_MSEC),
+    anclada al primer frame; sin marca se usa el mismo calendario t0 + i/fps.
+    Así los frames acumulados en el buffer del driver cuentan como retraso.
+    """
+    start = time.perf_counter()
+    first_msec = None
+    index = 0
+    while cap.isOpened():
+        if paced:
+            arrival = start + index / fps
+            wait = arrival - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if not paced:
+            msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+            if index == 0:
+                start = time.perf_counter()
+                first_msec = msec if msec > 0 else None
+            if first_msec is not None and msec > 0:
+                arrival = start + (msec - first_msec) / 1e3
+            else:
+                arrival = start + index / fps
+        yield frame, arrival
+        index += 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cifrado en tiempo real con presupuesto de latencia")
+    parser.add_argument("--input", default=VIDEO_INPUT)
+    parser.add_argument("--camera", type=int, default=None)
+    parser.add_argument("--output", default=MNAK_CONTAINER)
+    parser.add_argument("--policy", choices=("drop", "skip-preview"), default="drop")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="presupuesto por frame (por defecto 1000/FPS)")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--seed", type=float, default=0.1)
+    parser.add_argument("--warmup", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    keygen_enc = ChaosKeyGenerator(seed=args.seed)
+    keygen_dec = ChaosKeyGenerator(seed=args.seed)
+    keygen_enc.step_many(args.warmup)
+    keygen_dec.step_many(args.warmup)
+    encryptor = MNAKFrameEncryptor(keygen_enc)
+    decryptor = MNAKFrameEncryptor(keygen_dec)
+
+    live = args.camera is not None
+    cap = cv2.VideoCapture(args.camera) if live else open_video(args.input)
+    container = MNAKContainerWriter(args.output, FRAME_WIDTH, FRAME_HEIGHT, FPS)
+    checkpoints = CheckpointWriter(args.output + ".ckpt", CHECKPOINT_INTERVAL)
+    budget = DeadlineBudget(FPS, args.budget_ms / 1e3 if args.budget_ms else None)
+
+    stats = {"frames": 0, "encrypted": 0, "dropped": 0, "previews_skipped": 0}
+    try:
+        for frame_id, (frame, arrival) in enumerate(live_frames(cap, FPS, paced=not live)):
+            stats["frames"] += 1
+            checkpoints.record(frame_id, encryptor)
+
+            if args.policy == "drop" and budget.over_budget(arrival):
+                # Registro vacío: el descifrador también avanza un frame
+                encryptor.skip(1)
+                decryptor.skip(1)
+                container.append(b'')
+                stats["dropped"] += 1
+                continue
+
+            frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
+            encrypted_data = encryptor.encrypt(frame)
+            container.append(encrypted_data)
+            stats["encrypted"] += 1
+
+            if args.headless or budget.over_budget(arrival):
+                decryptor.skip(1)
+                stats["previews_skipped"] += not args.headless
+            else:
+                decrypted_frame, _ = decryptor.decrypt(encrypted_data)
+                cv2.imshow("Original | Decrypted", cv2.hconcat([frame, decrypted_frame]))
+                if cv2.waitKey(1) & 0xFF == 27:
+                    budget.done(arrival)
+                    break
+
+            budget.done(arrival)
+    finally:
+        cap.release()
+        container.close()
+        checkpoints.close()
+        if not args.headless:
+            cv2.destroyAllWindows()
+
+    lat = budget.percentiles()
+    print(f"Frames: {stats['frames']} | cifrados {stats['encrypted']} | "
+          f"descartados {stats['dropped']} | previews omitidas {stats['previews_skipped']}")
+    print(f"Presupuesto {budget.budget * 1e3:.1f} ms | latencia p50 {lat['p50']:.2f} ms | "
+          f"p95 {lat['p95']:.2f} ms | p99 {lat['p99']:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,7 +20,11 @@ def interpret_metric(key, value):
     return ""
 
 
-def generate_pdf_report(results, plots_dir, output_path):
+def generate_pdf_report(results, plots_dir, output_path, profile=None):
+    """
+    profile: resumen por etapa de StageProfiler.summary() (opcional); se
+    añade una tabla con el reparto del tiempo de cada frame.
+    """
 
     c = canvas.Canvas(output_path, pagesize=A4)
     width, height = A4
@@ -56,6 +60,30 @@ def generate_pdf_report(results, plots_dir, output_path):
             c.showPage()
             y = height - 50
 
+    # -------- PERFIL POR ETAPA --------
+    if profile:
+        if y < 120 + 15 * len(profile):
+            c.showPage()
+            y = height - 50
+
+        c.setFont("Helvetica-Bold", 13)
+        c.drawString(50, y, "Perfil por etapa (ms por frame)")
+        y -= 20
+
+        c.setFont("Helvetica-Bold", 9)
+        columns = [70, 200, 255, 310, 365, 430, 490]
+        for x, title in zip(columns, ["Etapa", "p50", "p95", "p99", "Media", "fps", "% ocupado"]):
+            c.drawString(x, y, title)
+        y -= 15
+
+        c.setFont("Helvetica", 9)
+        for name, s in sorted(profile.items(), key=lambda item: -item[1]["share"]):
+            row = [name, f"{s['p50_ms']:.2f}", f"{s['p95_ms']:.2f}", f"{s['p99_ms']:.2f}",
+                   f"{s['mean_ms']:.2f}", f"{s['throughput_fps']:.1f}", f"{s['share']:.1%}"]
+            for x, text in zip(columns, row):
+                c.drawString(x, y, text)
+            y -= 15
+
     # -------- GRÁFICOS --------
     c.showPage()
     c.setFont("Helvetica-Bold", 14)
@@ -69,6 +97,7 @@ def generate_pdf_report(results, plots_dir, output_path):
         "hist_decrypted.png",
         "corr_original.png",
         "corr_encrypted.png",
+        "stage_histograms.png",
     ]:
         path = os.path.join(plots_dir, img)
         if os.path.exists(path):
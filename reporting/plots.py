@@ -31,3 +31,33 @@ def save_correlation_plot(frame, title, path):
     plt.tight_layout()
     plt.savefig(path)
     plt.close()
+
+
+def save_stage_histograms(profiler, path):
+    # Histograma de latencia por frame de cada etapa del pipeline
+    names = list(profiler.summary())
+    fig, axes = plt.subplots(len(names), 1, figsize=(6, 1.8 * len(names)), squeeze=False)
+    for ax, name in zip(axes[:, 0], names):
+        ax.hist(np.array(profiler.samples[name]) * 1e3, bins=30)
+        ax.set_title(name, fontsize=9)
+        ax.set_ylabel("Frames")
+    axes[-1, 0].set_xlabel("Latencia (ms)")
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close(fig)
+
+
+def save_bifurcation_plot(values, peaks, param, variable, path):
+    # Máximos locales de la variable frente al parámetro (una columna por punto)
+    xs = np.repeat(values, peaks.shape[1])
+    ys = peaks.ravel()
+    keep = np.isfinite(ys)
+
+    plt.figure(figsize=(8, 5))
+    plt.scatter(xs[keep], ys[keep], s=0.2, c="k")
+    plt.title(f"Diagrama de bifurcación ({param})")
+    plt.xlabel(param)
+    plt.ylabel(f"máx. locales de {variable}")
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
@@ -0,0 +1,152 @@
+"""
+encryption_server.py
+Servicio asyncio de cifrado multi-sesión sobre sockets locales (TCP o Unix)
+
+Protocolo (little-endian):
+    cliente -> servidor   header de sesión SESSION_HEADER
+                          frames crudos BGR de alto*ancho*3 bytes, hasta EOF
+    servidor -> cliente   por frame: <Q longitud + ciphertext MNAK
+
+Cada sesión tiene su propio ChaosKeyGenerator (semilla del header) y su
+MNAKFrameEncryptor. La derivación de claves es secuencial y barata y corre
+en el event loop; el AES corre en un executor compartido. Cada sesión tiene
+como máximo `window` frames en vuelo, así que ninguna acapara el executor y
+las sesiones se intercalan en su cola FIFO.
+
+Uso:
+    python -m service.encryption_server [--host H --port P | --unix PATH] [--workers N]
+"""
+
+import argparse
+import asyncio
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from crypto.chaos_generator import ChaosKeyGenerator
+from crypto.mnk_encryptor import MNAKFrameEncryptor
+
+MAGIC = b'MNKS'
+# magic, ancho, alto, semilla, warmup
+SESSION_HEADER = struct.Struct('<4sIIdI')
+RECORD_LENGTH = struct.Struct('<Q')
+
+# Límites del header: un frame no puede superar MAX_FRAME_BYTES (4K BGR
+# ocupa ~24 MiB) y el warmup corre en el event loop
+MAX_FRAME_BYTES = 64 << 20
+MAX_WARMUP = 1_000_000
+
+
+class EncryptionServer:
+    def __init__(self, workers=4, window=2, max_frame_bytes=MAX_FRAME_BYTES):
+        self.executor = ThreadPoolExecutor(workers)
+        self.window = window
+        self.max_frame_bytes = max_frame_bytes
+        self.sessions = {}
+        self.next_session = 0
+        self.server = None
+
+    async def start_tcp(self, host="127.0.0.1", port=9000):
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    async def start_unix(self, path):
+        self.server = await asyncio.start_unix_server(self._handle, path)
+        return self.server
+
+    async def _handle(self, reader, writer):
+        session_id = self.next_session
+        self.next_session += 1
+        loop = asyncio.get_running_loop()
+        try:
+            header = await reader.readexactly(SESSION_HEADER.size)
+            magic, width, height, seed, warmup = SESSION_HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"Magic number inválido: {magic}")
+            # Con 0 bytes por frame readexactly(0) nunca llega a EOF y la
+            # sesión emitiría registros sin fin
+            if width <= 0 or height <= 0:
+                raise ValueError(f"Dimensiones inválidas: {width}x{height}")
+            frame_bytes = width * height * 3
+            if frame_bytes > self.max_frame_bytes:
+                raise ValueError(f"Frame de {frame_bytes} bytes supera el máximo de {self.max_frame_bytes}")
+            if warmup > MAX_WARMUP:
+                raise ValueError(f"Warmup {warmup} supera el máximo de {MAX_WARMUP}")
+
+            keygen = ChaosKeyGenerator(seed=seed)
+            keygen.step_many(warmup)
+            encryptor = MNAKFrameEncryptor(keygen)
+            self.sessions[session_id] = {"width": width, "height": height, "frames": 0}
+
+            inflight = deque()
+            while True:
+                try:
+                    data = await reader.readexactly(frame_bytes)
+                except asyncio.IncompleteReadError as e:
+                    if e.partial:
+                        raise
+                    break  # EOF limpio entre frames
+
+                frame = np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+                job = encryptor.prepare(frame)
+                inflight.append(loop.run_in_executor(self.executor, encryptor.encrypt_prepared, *job))
+                if len(inflight) >= self.window:
+                    await self._send(writer, await inflight.popleft(), session_id)
+
+            while inflight:
+                await self._send(writer, await inflight.popleft(), session_id)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            print(f"Sesión {session_id}: {e}")
+        finally:
+            self.sessions.pop(session_id, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _send(self, writer, ciphertext, session_id):
+        writer.write(RECORD_LENGTH.pack(len(ciphertext)))
+        writer.write(ciphertext)
+        await writer.drain()
+        self.sessions[session_id]["frames"] += 1
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown()
+
+
+async def _serve(args):
+    service = EncryptionServer(workers=args.workers, window=args.window,
+                               max_frame_bytes=int(args.max_frame_mb * (1 << 20)))
+    if args.unix:
+        server = await service.start_unix(args.unix)
+    else:
+        server = await service.start_tcp(args.host, args.port)
+    print(f"Servidor escuchando en {args.unix or f'{args.host}:{args.port}'}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio de cifrado multi-sesión")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--unix", default=None, help="ruta de socket Unix (en lugar de TCP)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--window", type=int, default=2, help="frames en vuelo por sesión")
+    parser.add_argument("--max-frame-mb", type=float, default=MAX_FRAME_BYTES / (1 << 20),
+                        help="tamaño máximo de frame aceptado")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+loopback_client.py
+Cliente de prueba: reproduce frames sintéticos contra el servicio de cifrado
+y verifica cada ciphertext descifrándolo localmente con la misma semilla.
+
+Uso:
+    python -m service.loopback_client [--sessions S] [--frames N] [--width W --height H]
+    (sin --port/--unix levanta un servidor en proceso)
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from crypto.chaos_generator import ChaosKeyGenerator
+from crypto.mnk_encryptor import MNAKFrameEncryptor
+from service.encryption_server import EncryptionServer, MAGIC, SESSION_HEADER, RECORD_LENGTH
+
+
+async def replay_session(connect, n_frames, width, height, seed, warmup=1000):
+    """
+    Envía n_frames sintéticos y devuelve cuántos se descifraron correctamente.
+    """
+    reader, writer = await connect()
+    rng = np.random.default_rng(int(seed * 1e6))
+    frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(n_frames)]
+
+    async def send():
+        writer.write(SESSION_HEADER.pack(MAGIC, width, height, seed, warmup))
+        for frame in frames:
+            writer.write(frame.tobytes())
+            await writer.drain()
+        writer.write_eof()
+
+    sender = asyncio.create_task(send())
+
+    keygen = ChaosKeyGenerator(seed=seed)
+    keygen.step_many(warmup)
+    decryptor = MNAKFrameEncryptor(keygen)
+    ok = 0
+    for frame in frames:
+        (length,) = RECORD_LENGTH.unpack(await reader.readexactly(RECORD_LENGTH.size))
+        decrypted, _ = decryptor.decrypt(await reader.readexactly(length))
+        ok += np.array_equal(decrypted, frame)
+
+    await sender
+    writer.close()
+    await writer.wait_closed()
+    return ok
+
+
+async def _run(args):
+    server = None
+    if args.unix:
+        connect = lambda: asyncio.open_unix_connection(args.unix)
+    elif args.port:
+        connect = lambda: asyncio.open_connection(args.host, args.port)
+    else:
+        server = EncryptionServer(workers=args.workers)
+        tcp = await server.start_tcp(args.host, 0)
+        port = tcp.sockets[0].getsockname()[1]
+        connect = lambda: asyncio.open_connection(args.host, port)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        replay_session(connect, args.frames, args.width, args.height, seed=0.1 + 0.01 * i)
+        for i in range(args.sessions)
+    ])
+    elapsed = time.perf_counter() - start
+
+    if server is not None:
+        await server.close()
+
+    total = args.sessions * args.frames
+    print(f"Sesiones: {args.sessions} | frames verificados {sum(results)}/{total}")
+    print(f"Tiempo: {elapsed:.2f}s ({total / elapsed:.2f} fps agregados)")
+    return sum(results) == total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cliente loopback con frames sintéticos")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--unix", default=None)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--width", type=int, default=374)
+    parser.add_argument("--height", type=int, default=566)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+    return 0 if asyncio.run(_run(args)) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -12,21 +12,24 @@ import os
 # =========================
 
 # Análisis
-from analysis.video_loader import load_video
-from analysis.entropy_tests import entropy_global, entropy_per_frame
-from analysis.statistical_tests import correlation, variance
+from analysis.runner import MetricRunner
 from analysis.quality_tests import psnr, mse, mad
-from analysis.ssim_tests import ssim
+from analysis.ssim_tests import ssim, ssim_video
+from analysis.video_loader import iter_video
+from analysis.frame_cache import FrameCache
 from analysis.robustness_tests import add_noise, occlusion
-from analysis.differential_tests import npcr, uaci
 from analysis.efficiency_tests import time_per_frame
 from analysis.frame_utils import match_frame_size
-from analysis.nist_tests import monobit_test, block_frequency_test
+from analysis.nist_tests import monobit_test, block_frequency_test, NISTStream, NIST_TESTS, iter_ciphertext
+from analysis.differential_campaign import run_campaign
 
 # Reportes
-from reporting.plots import save_histogram, save_correlation_plot
+from reporting.plots import save_histogram, save_correlation_plot, save_stage_histograms
 from reporting.pdf_report import generate_pdf_report
 
+# Perfil por etapa
+from utils.timer import StageProfiler
+
 
 # =========================
 # CONFIGURACIÓN DE RUTAS
@@ -40,143 +43,229 @@ PLOTS_DIR = os.path.join(RESULTS_DIR, "plots")
 REPORT_PATH = os.path.join(RESULTS_DIR, "report.pdf")
 
 ORIGINAL_VIDEO = os.path.join(DATA_DIR, "video_prueba3.mp4")
-ENCRYPTED_VIDEO = os.path.join(DATA_DIR, "encrypted_video.mp4")
+# Ciphertext sin pérdidas de main.py (encrypted_video.mp4 es solo una
+# previsualización submuestreada y con pérdidas)
+ENCRYPTED_STREAM = os.path.join(DATA_DIR, "encrypted_video.raw")
 DECRYPTED_VIDEO = os.path.join(DATA_DIR, "decrypted_video.mp4")
+STAGE_PROFILE = os.path.join(DATA_DIR, "stage_profile.json")
+MNAK_CONTAINER = os.path.join(DATA_DIR, "encrypted_video.mnak")
+
+# Ciphertext analizado por la batería NIST para el informe (batch.py nist
+# analiza el contenedor completo)
+NIST_MAX_BYTES = 16 << 20
+
+# Frames decodificados reutilizados entre ejecuciones (memmaps .npy)
+FRAME_CACHE_DIR = os.path.join(DATA_DIR, "frame_cache")
+FRAME_CACHE_MAX_BYTES = 4 << 30
+
+# Procesos para las métricas (1 = todo en el proceso principal)
+ANALYSIS_WORKERS = os.cpu_count()
+
+# Campaña diferencial: mismo cifrador que main.py (AES-CFB, semilla 0.1,
+# warmup 1000, frames 374x566) sobre frames equiespaciados del original
+DIFFERENTIAL_SCHEME = "aes-cfb"
+DIFFERENTIAL_FRAMES = 8
+DIFFERENTIAL_POSITIONS = 64
+DIFFERENTIAL_SIZE = (374, 566)
 
 os.makedirs(PLOTS_DIR, exist_ok=True)
 
 
+# =========================
+# ENTRADAS DERIVADAS
+# =========================
+# Funciones de nivel de módulo: se ejecutan en los procesos del runner
+
+def reference_frame(stats, reference=None):
+    if stats.frames == 0:
+        raise RuntimeError("Uno o más videos no pudieron cargarse correctamente")
+    if reference is None:
+        return stats.first
+    return match_frame_size(reference, stats.first)
+
+
+def video_ssim(orig_path, dec_path, cache=None):
+    # SSIM de cada frame descifrado contra su original, en streaming
+    pairs = ((fo, match_frame_size(fo, fd))
+             for fo, fd in zip(iter_video(orig_path, cache=cache),
+                               iter_video(dec_path, cache=cache)))
+    return ssim_video(pairs)
+
+
+def nist_battery(path, max_bytes):
+    return NISTStream(sequence_bits=1_000_000).consume(iter_ciphertext(path, max_bytes))
+
+
+def nist_summary(results, name):
+    r = results.get(name)
+    if r is None:
+        return "sin secuencias completas"
+    status = "pasa"
+    if not r["passed"]:
+        status = (f"falla ({r['failed_subtests']} de {r['subtests']}; "
+                  f"~{r['expected_failures']:.1f} esperadas por azar)")
+    # Con varias subpruebas (plantillas, direcciones) se muestra la peor
+    worst = f"peor de {r['subtests']} subpruebas: " if r["subtests"] > 1 else ""
+    return (f"{worst}{r['proportion']:.4f} (mín. {r['min_proportion']:.4f}) | "
+            f"uniformidad p={r['uniformity_p']:.4f} | {status}")
+
+
+def psnr_with_noise(f_orig, f_enc):
+    return psnr(f_orig, match_frame_size(f_orig, add_noise(f_enc, sigma=15)))
+
+
+def psnr_with_occlusion(f_orig, f_enc):
+    return psnr(f_orig, match_frame_size(f_orig, occlusion(f_enc, block_size=80)))
+
+
 # =========================
 # MAIN
 # =========================
 
 def main():
 
+    runner = MetricRunner(workers=ANALYSIS_WORKERS)
+    cache = FrameCache(FRAME_CACHE_DIR, FRAME_CACHE_MAX_BYTES)
+
     # =========================
-    # CARGA DE VIDEOS
+    # LECTURA EN STREAMING (VIDEOS COMPLETOS, MEMORIA ACOTADA)
     # =========================
-    orig_frames, t_orig = load_video(ORIGINAL_VIDEO)
-    enc_frames, t_enc = load_video(ENCRYPTED_VIDEO)
-    dec_frames, t_dec = load_video(DECRYPTED_VIDEO)
-
-    if len(orig_frames) == 0 or len(enc_frames) == 0 or len(dec_frames) == 0:
-        raise RuntimeError("Uno o más videos no pudieron cargarse correctamente")
+    # Los tramos de cada video se analizan en paralelo y se unen
+    runner.video("orig", ORIGINAL_VIDEO, cache=cache)
+    runner.video("enc", ENCRYPTED_STREAM, cache=cache)
+    runner.video("dec", DECRYPTED_VIDEO, directions=(), cache=cache)
 
     # =========================
     # FRAMES DE REFERENCIA
     # =========================
-    f_orig = orig_frames[0]
-    f_enc = match_frame_size(f_orig, enc_frames[0])
-    f_dec = match_frame_size(f_orig, dec_frames[0])
+    runner.input("f_orig", reference_frame, "orig", local=True)
+    # Sin redimensionar: la interpolación alteraría las estadísticas del ciphertext
+    runner.input("f_enc", reference_frame, "enc", local=True)
+    runner.input("f_dec", reference_frame, "dec", "f_orig", local=True)
 
     # =========================
     # ALEATORIEDAD (ENTROPÍA)
     # =========================
-    randomness_results = {
-        "Entropía global (Original)": entropy_global(orig_frames),
-        "Entropía global (Cifrado)": entropy_global(enc_frames),
-        "Entropía promedio por frame (Cifrado)": entropy_per_frame(enc_frames),
-    }
+    section = "Aleatoriedad"
+    runner.metric(section, "Entropía global (Original)",
+                  lambda s: s.histogram.entropy_global(), "orig", local=True)
+    runner.metric(section, "Entropía global (Cifrado)",
+                  lambda s: s.histogram.entropy_global(), "enc", local=True)
+    runner.metric(section, "Entropía promedio por frame (Cifrado)",
+                  lambda s: s.histogram.entropy_per_frame(), "enc", local=True)
 
     # =========================
     # PRUEBAS ESTADÍSTICAS
     # =========================
-    statistical_results = {
-        "Correlación horizontal (Original)": correlation(f_orig, "horizontal"),
-        "Correlación horizontal (Cifrado)": correlation(f_enc, "horizontal"),
-        "Correlación vertical (Cifrado)": correlation(f_enc, "vertical"),
-        "Correlación diagonal (Cifrado)": correlation(f_enc, "diagonal"),
-        "Varianza (Cifrado)": variance(f_enc),
-    }
+    section = "Estadísticas"
+    runner.metric(section, "Correlación horizontal (Original)",
+                  lambda s: s.correlation.correlation("horizontal"), "orig", local=True)
+    for mode in ("horizontal", "vertical", "diagonal"):
+        runner.metric(section, f"Correlación {mode} (Cifrado)",
+                      lambda s, mode=mode: s.correlation.correlation(mode), "enc", local=True)
+    runner.metric(section, "Varianza (Cifrado)",
+                  lambda s: s.histogram.variance(), "enc", local=True)
 
     # =========================
     # CALIDAD DEL DESCIFRADO
     # =========================
-    quality_results = {
-        "PSNR (dB)": psnr(f_orig, f_dec),
-        "MSE": mse(f_orig, f_dec),
-        "MAD": mad(f_orig, f_dec),
-        "SSIM": ssim(f_orig, f_dec),
-    }
+    section = "Calidad del descifrado"
+    runner.metric(section, "PSNR (dB)", psnr, "f_orig", "f_dec")
+    runner.metric(section, "MSE", mse, "f_orig", "f_dec")
+    runner.metric(section, "MAD", mad, "f_orig", "f_dec")
+    runner.metric(section, "SSIM", ssim, "f_orig", "f_dec")
+    runner.input("ssim_frames", video_ssim, orig_path=ORIGINAL_VIDEO, dec_path=DECRYPTED_VIDEO,
+                 cache=cache)
+    runner.metric(section, "SSIM promedio (todos los frames)",
+                  lambda v: float(v.mean()) if len(v) else 0.0, "ssim_frames", local=True)
+    runner.metric(section, "SSIM mínimo (todos los frames)",
+                  lambda v: float(v.min()) if len(v) else 0.0, "ssim_frames", local=True)
 
     # =========================
     # ROBUSTEZ (ATAQUES SIMULADOS)
     # =========================
-    noisy_enc = add_noise(f_enc, sigma=15)
-    occluded_enc = occlusion(f_enc, block_size=80)
-
-    robustness_results = {
-        "PSNR con ruido": psnr(f_orig, noisy_enc),
-        "PSNR con oclusión": psnr(f_orig, occluded_enc),
-    }
+    section = "Robustez"
+    runner.metric(section, "PSNR con ruido", psnr_with_noise, "f_orig", "f_enc")
+    runner.metric(section, "PSNR con oclusión", psnr_with_occlusion, "f_orig", "f_enc")
 
     # =========================
     # PRUEBAS DIFERENCIALES (OFFLINE)
     # =========================
-    if len(enc_frames) >= 2:
-        f_enc_1 = enc_frames[0]
-        f_enc_2 = match_frame_size(f_enc_1, enc_frames[1])
-
-        differential_results = {
-            "NPCR (%)": npcr(f_enc_1, f_enc_2),
-            "UACI (%)": uaci(f_enc_1, f_enc_2),
-        }
-    else:
-        differential_results = {
-            "NPCR (%)": 0.0,
-            "UACI (%)": 0.0,
-        }
+    # Mismo estado caótico, plaintext con un solo píxel modificado. La
+    # campaña corre como un nodo más del pool (workers=1 dentro): un nodo
+    # local bloquearía el despacho del resto de métricas hasta terminar
+    section = "Pruebas diferenciales"
+    runner.input("differential", run_campaign, path=ORIGINAL_VIDEO,
+                 scheme=DIFFERENTIAL_SCHEME, frames=DIFFERENTIAL_FRAMES,
+                 positions_per_frame=DIFFERENTIAL_POSITIONS, size=DIFFERENTIAL_SIZE,
+                 workers=1)
+    runner.metric(section, "NPCR medio (%)", lambda r: r["npcr"]["mean"], "differential", local=True)
+    runner.metric(section, "NPCR mínimo (%)", lambda r: r["npcr"]["min"], "differential", local=True)
+    runner.metric(section, "UACI medio (%)", lambda r: r["uaci"]["mean"], "differential", local=True)
+    runner.metric(section, "Pares que superan N* (%)",
+                  lambda r: 100.0 * r["npcr_pass_rate"], "differential", local=True)
+    runner.metric(section, "Pares dentro de (U*-, U*+) (%)",
+                  lambda r: 100.0 * r["uaci_pass_rate"], "differential", local=True)
+    runner.metric(section, "Pares evaluados", lambda r: r["pairs"], "differential", local=True)
 
     # =========================
     # PRUEBAS NIST (OFFLINE)
     # =========================
-    nist_results = {
-        "Monobit Test": monobit_test(f_enc),
-        "Block Frequency Test": block_frequency_test(f_enc),
-    }
+    section = "Pruebas NIST"
+    runner.metric(section, "Monobit Test", monobit_test, "f_enc")
+    runner.metric(section, "Block Frequency Test", block_frequency_test, "f_enc")
+
+    # Batería SP 800-22 con p-values sobre el ciphertext del contenedor MNAK:
+    # proporción de secuencias de 10^6 bits con p >= 0.01
+    if os.path.exists(MNAK_CONTAINER):
+        runner.input("nist", nist_battery, path=MNAK_CONTAINER, max_bytes=NIST_MAX_BYTES)
+        for name in NIST_TESTS:
+            runner.metric("Batería NIST SP 800-22", name,
+                          lambda r, name=name: nist_summary(r, name), "nist", local=True)
 
     # =========================
     # EFICIENCIA
     # =========================
-    efficiency_results = {
-        "Tiempo lectura original (s)": t_orig,
-        "Tiempo lectura cifrado (s)": t_enc,
-        "Tiempo lectura descifrado (s)": t_dec,
-        "Tiempo por frame (cifrado)": time_per_frame(t_enc, len(enc_frames)),
-    }
+    section = "Eficiencia"
+    runner.metric(section, "Tiempo lectura original (s)", lambda s: s.read_time, "orig", local=True)
+    runner.metric(section, "Tiempo lectura cifrado (s)", lambda s: s.read_time, "enc", local=True)
+    runner.metric(section, "Tiempo lectura descifrado (s)", lambda s: s.read_time, "dec", local=True)
+    runner.metric(section, "Tiempo por frame (cifrado)",
+                  lambda s: time_per_frame(s.read_time, s.frames), "enc", local=True)
 
     # =========================
     # GRÁFICOS
     # =========================
-    save_histogram(f_orig, "Histograma - Original",
-                   os.path.join(PLOTS_DIR, "hist_original.png"))
+    runner.task("hist_original", save_histogram, "f_orig", title="Histograma - Original",
+                path=os.path.join(PLOTS_DIR, "hist_original.png"))
 
-    save_histogram(f_enc, "Histograma - Cifrado",
-                   os.path.join(PLOTS_DIR, "hist_encrypted.png"))
+    runner.task("hist_encrypted", save_histogram, "f_enc", title="Histograma - Cifrado",
+                path=os.path.join(PLOTS_DIR, "hist_encrypted.png"))
 
-    save_histogram(f_dec, "Histograma - Descifrado",
-                   os.path.join(PLOTS_DIR, "hist_decrypted.png"))
+    runner.task("hist_decrypted", save_histogram, "f_dec", title="Histograma - Descifrado",
+                path=os.path.join(PLOTS_DIR, "hist_decrypted.png"))
 
-    save_correlation_plot(f_orig, "Correlación - Original",
-                          os.path.join(PLOTS_DIR, "corr_original.png"))
+    runner.task("corr_original", save_correlation_plot, "f_orig", title="Correlación - Original",
+                path=os.path.join(PLOTS_DIR, "corr_original.png"))
 
-    save_correlation_plot(f_enc, "Correlación - Cifrado",
-                          os.path.join(PLOTS_DIR, "corr_encrypted.png"))
+    runner.task("corr_encrypted", save_correlation_plot, "f_enc", title="Correlación - Cifrado",
+                path=os.path.join(PLOTS_DIR, "corr_encrypted.png"))
 
     # =========================
     # CONSOLIDACIÓN DE RESULTADOS
     # =========================
-    results = {
-        "Aleatoriedad": randomness_results,
-        "Estadísticas": statistical_results,
-        "Calidad del descifrado": quality_results,
-        "Robustez": robustness_results,
-        "Pruebas diferenciales": differential_results,
-        "Pruebas NIST": nist_results,
-        "Eficiencia": efficiency_results,
-    }
-
-    generate_pdf_report(results, PLOTS_DIR, REPORT_PATH)
+    # Mismo diccionario anidado {sección: {métrica: valor}} del informe
+    results = runner.run()
+
+    # Tiempos por etapa registrados por main.py / main_mnak.py
+    profile = None
+    if os.path.exists(STAGE_PROFILE):
+        profiler = StageProfiler.load(STAGE_PROFILE)
+        profile = profiler.summary()
+        results["Eficiencia"].update(profiler.metrics())
+        save_stage_histograms(profiler, os.path.join(PLOTS_DIR, "stage_histograms.png"))
+
+    generate_pdf_report(results, PLOTS_DIR, REPORT_PATH, profile=profile)
 
     print("Análisis finalizado correctamente")
     print("Informe generado en:", REPORT_PATH)
@@ -85,3 +85,94 @@ class AudioExtractor:
             'sample_rate': self.sample_rate,
             'total_samples': len(self.audio_data) if self.audio_data is not None else 0
         }
+
+
+class StreamingAudioExtractor(AudioExtractor):
+    """
+    Lee PCM mono int16 de un proceso ffmpeg local por pipe, en bloques de
+    samples_per_frame y al ritmo del bucle de video. Memoria constante e
+    independiente de la duración, sin archivos temporales. Los frames deben
+    pedirse en orden creciente.
+    """
+
+    def __init__(self, video_path, fps=30, sample_rate=44100, ffmpeg_bin="ffmpeg"):
+        super().__init__(video_path, fps)
+        self.sample_rate = sample_rate
+        self.samples_per_frame = int(sample_rate / fps)
+        self.ffmpeg_bin = ffmpeg_bin
+        self.proc = None
+        self.next_frame = 0
+        self.samples_read = 0
+        self._pending = None
+
+    def open(self):
+        cmd = [
+            self.ffmpeg_bin, "-v", "error", "-nostdin",
+            "-i", self.video_path,
+            "-vn", "-map", "0:a:0",
+            "-ac", "1", "-ar", str(self.sample_rate),
+            "-f", "s16le", "-acodec", "pcm_s16le", "-",
+        ]
+        try:
+            self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"Error iniciando ffmpeg: {e}")
+            return False
+
+        # Leer el primer bloque para saber si hay pista de audio
+        self._pending = self._read_block()
+        if self._pending is None and self.proc.wait() != 0:
+            print("El video no tiene audio")
+            self.close()
+            return False
+
+        print(f"Audio (stream): {self.sample_rate}Hz, {self.samples_per_frame} muestras/frame")
+        return True
+
+    def _read_block(self):
+        if self.proc is None:
+            return None
+        block = np.zeros(self.samples_per_frame, dtype=np.int16)
+        view = memoryview(block).cast('B')
+        filled = 0
+        while filled < len(view):
+            n = self.proc.stdout.readinto(view[filled:])
+            if not n:
+                break
+            filled += n
+        if filled == 0:
+            return None
+        self.samples_read += filled // 2
+        return block  # relleno con ceros al final del audio
+
+    def _next_block(self):
+        block, self._pending = self._pending, None
+        if block is None:
+            block = self._read_block()
+        self.next_frame += 1
+        if block is None:
+            return np.zeros(self.samples_per_frame, dtype=np.int16)
+        return block
+
+    def get_audio_chunk_for_frame(self, frame_index):
+        if self.proc is None:
+            return None
+        if frame_index < self.next_frame:
+            raise ValueError(f"Audio en streaming: frame {frame_index} ya consumido")
+        while self.next_frame < frame_index:
+            self._next_block()
+        return self._next_block()
+
+    def get_dimensions(self):
+        return {
+            'A': self.samples_per_frame,
+            'sample_rate': self.sample_rate,
+            'total_samples': self.samples_read
+        }
+
+    def close(self):
+        if self.proc is not None:
+            self.proc.stdout.close()
+            self.proc.kill()
+            self.proc.wait()
+            self.proc = None
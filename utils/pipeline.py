@@ -0,0 +1,111 @@
+import queue
+import threading
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class _Stopped(Exception):
+    pass
+
+
+def map_stage(fn):
+    """
+    Adapts a per-item function into a stage.
+    """
+    def stage(items):
+        for item in items:
+            yield fn(item)
+    return stage
+
+
+class Pipeline:
+    """
+    Runs `source` and every stage on its own thread, connected by bounded
+    queues (backpressure: a fast stage blocks once its output queue is full).
+    A stage is a callable taking an iterator and returning an iterator, so
+    stateful stages (frame counters, the chaos key sequence) see items in
+    order; per-item functions can be wrapped with map_stage().
+
+    Iterating the pipeline yields the output of the last stage on the
+    calling thread, which keeps the OpenCV GUI on the main thread.
+    Exceptions raised by any stage are re-raised there.
+    """
+
+    def __init__(self, source, stages, maxsize=8):
+        self.source = source
+        self.stages = stages
+        self.maxsize = maxsize
+        self.stop = threading.Event()
+        self.threads = []
+        self.queues = []
+
+    def _put(self, q, item):
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q):
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        raise _Stopped()
+
+    def _drain(self, q):
+        while True:
+            item = self._get(q)
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+
+    def _run(self, stage, q_in, q_out):
+        try:
+            items = self.source if q_in is None else self._drain(q_in)
+            for item in (items if stage is None else stage(items)):
+                if not self._put(q_out, item):
+                    return
+        except _Stopped:
+            return
+        except BaseException as e:
+            self._put(q_out, _Failure(e))
+            return
+        self._put(q_out, _END)
+
+    def __iter__(self):
+        self.queues = queues = [queue.Queue(self.maxsize) for _ in range(len(self.stages) + 1)]
+        self.threads = [threading.Thread(target=self._run, args=(None, None, queues[0]), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            self.threads.append(threading.Thread(
+                target=self._run, args=(stage, queues[i], queues[i + 1]), daemon=True))
+        for t in self.threads:
+            t.start()
+
+        try:
+            yield from self._drain(queues[-1])
+        finally:
+            self.close()
+
+    def close(self):
+        self.stop.set()
+        for t in self.threads:
+            t.join()
+        self.threads = []
+        # Drop items still in flight: they may be views over buffers (an
+        # mmap) that the caller closes next, and a traceback through
+        # __iter__ would otherwise keep the queues alive
+        for q in self.queues:
+            with q.mutex:
+                q.queue.clear()
+        self.queues = []
@@ -0,0 +1,34 @@
+import time
+import numpy as np
+
+
+class DeadlineBudget:
+    """
+    Per-frame latency budget for live sources (1 / fps by default).
+
+    Frame i is due at its arrival time; `over_budget` tells whether the
+    pipeline is already later than the budget for it, and `done` records the
+    end-to-end latency (arrival -> written) of every processed frame.
+    """
+
+    def __init__(self, fps, budget=None):
+        self.fps = fps
+        self.budget = budget if budget is not None else 1.0 / fps
+        self.latencies = []
+
+    def lag(self, arrival):
+        return time.perf_counter() - arrival
+
+    def over_budget(self, arrival):
+        return self.lag(arrival) > self.budget
+
+    def done(self, arrival):
+        latency = self.lag(arrival)
+        self.latencies.append(latency)
+        return latency
+
+    def percentiles(self, qs=(50, 95, 99)):
+        if not self.latencies:
+            return {f"p{q}": 0.0 for q in qs}
+        values = np.percentile(np.array(self.latencies) * 1e3, qs)
+        return {f"p{q}": float(v) for q, v in zip(qs, values)}
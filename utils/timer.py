@@ -1,8 +1,117 @@
+import json
 import time
 
+import numpy as np
+
 class Timer:
     def __init__(self):
         self.start = time.time()
 
     def elapsed(self):
         return time.time() - self.start
+
+
+class _Stage:
+    __slots__ = ("samples", "start")
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class StageProfiler:
+    """
+    Tiempo de cada etapa (decodificación, AES, escritura, ...) por frame:
+
+        with profiler.stage("AES"):
+            ...
+
+    Cada etapa guarda una duración por llamada; summary() da p50/p95/p99,
+    throughput y "share", la fracción de la suma del tiempo ocupado de todas
+    las etapas (no del tiempo de reloj: en el pipeline las etapas se
+    solapan). Cada etapa debe medirse desde un solo hilo. Deshabilitado,
+    stage() no mide nada.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.samples = {}
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self.samples.setdefault(name, []))
+
+    def add(self, name, seconds):
+        if self.enabled:
+            self.samples.setdefault(name, []).append(seconds)
+
+    def summary(self):
+        total = sum(sum(s) for s in self.samples.values())
+        stats = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            ms = np.array(samples) * 1e3
+            p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+            stage_total = float(ms.sum()) / 1e3
+            stats[name] = {
+                "frames": len(samples),
+                "total_s": stage_total,
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "throughput_fps": len(samples) / stage_total if stage_total > 0 else 0.0,
+                "share": stage_total / total if total > 0 else 0.0,
+            }
+        return stats
+
+    def histogram(self, name, bins=30):
+        return np.histogram(np.array(self.samples[name]) * 1e3, bins=bins)
+
+    def metrics(self):
+        # Una línea por etapa, para la sección "Eficiencia" del informe
+        return {
+            f"Etapa {name}": (f"p50 {s['p50_ms']:.2f} ms | p95 {s['p95_ms']:.2f} ms | "
+                              f"p99 {s['p99_ms']:.2f} ms | {s['throughput_fps']:.1f} fps | "
+                              f"{s['share']:.1%} del tiempo ocupado de etapas")
+            for name, s in self.summary().items()
+        }
+
+    def report(self):
+        print(f"{'Etapa':<22} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'fps':>9} {'% ocup.':>8}")
+        for name, s in self.summary().items():
+            print(f"{name:<22} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f} "
+                  f"{s['throughput_fps']:>9.1f} {s['share']:>8.1%}")
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"stages": self.samples}, f)
+
+    @classmethod
+    def load(cls, path):
+        profiler = cls()
+        with open(path) as f:
+            profiler.samples = json.load(f)["stages"]
+        return profiler
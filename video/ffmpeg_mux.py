@@ -0,0 +1,151 @@
+"""
+ffmpeg_mux.py
+Mux en streaming de video descifrado + audio hacia un único proceso ffmpeg
+
+Los frames (BGR24) van por stdin y el audio PCM s16le mono por un segundo
+pipe (pipe:3). Cada pipe lo alimenta su propio hilo desde una cola acotada,
+así ffmpeg nunca se bloquea esperando un stream mientras el otro está lleno
+y la memoria no crece con la duración. El pipe de audio requiere un sistema
+POSIX (pass_fds); open_muxer recurre a un VideoWriter de OpenCV, sin audio,
+si el muxer no puede arrancar.
+"""
+
+import os
+import queue
+import subprocess
+import threading
+
+import cv2
+import numpy as np
+
+_END = object()
+
+
+class _PipeFeeder(threading.Thread):
+    def __init__(self, pipe, maxsize):
+        super().__init__(daemon=True)
+        self.pipe = pipe
+        self.queue = queue.Queue(maxsize)
+        self.error = None
+
+    def run(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is _END:
+                    break
+                if self.error is None:
+                    self.pipe.write(item)
+        except (BrokenPipeError, OSError) as e:
+            self.error = e
+            # Seguir vaciando la cola para no bloquear al productor
+            while self.queue.get() is not _END:
+                pass
+        finally:
+            try:
+                self.pipe.close()
+            except OSError:
+                pass
+
+
+class StreamingMuxer:
+    def __init__(self, path, width, height, fps, sample_rate=None, ffmpeg_bin=None,
+                 vcodec="libx264", acodec="aac", queue_size=8, audio_queue_size=512):
+        if ffmpeg_bin is None:
+            from config.settings import FFMPEG_BIN as ffmpeg_bin
+        if sample_rate and os.name != "posix":
+            raise OSError("El pipe de audio de ffmpeg requiere un sistema POSIX (pass_fds)")
+        cmd = [
+            ffmpeg_bin, "-v", "error", "-y",
+            # Formatos crudos con parámetros explícitos: sin análisis, que de
+            # otro modo bloquea leyendo segundos de un pipe antes de empezar
+            "-analyzeduration", "0", "-probesize", "32",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+            "-r", str(fps), "-i", "pipe:0",
+        ]
+        pass_fds = ()
+        audio_r = audio_w = None
+        if sample_rate:
+            audio_r, audio_w = os.pipe()
+            pass_fds = (audio_r,)
+            cmd += [
+                "-analyzeduration", "0", "-probesize", "32",
+                "-f", "s16le", "-ar", str(sample_rate), "-ac", "1",
+                "-i", f"pipe:{audio_r}",
+            ]
+        cmd += ["-c:v", vcodec, "-pix_fmt", "yuv420p"]
+        if sample_rate:
+            cmd += ["-c:a", acodec]
+        cmd.append(path)
+
+        try:
+            self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, pass_fds=pass_fds)
+        except OSError:
+            if audio_r is not None:
+                os.close(audio_r)
+                os.close(audio_w)
+            raise
+        self.video = _PipeFeeder(self.proc.stdin, queue_size)
+        self.video.start()
+
+        self.audio = None
+        if sample_rate:
+            os.close(audio_r)
+            # El encoder de video retiene decenas de frames (lookahead) y
+            # ffmpeg deja de leer audio mientras tanto: la cola de audio
+            # (bloques pequeños) debe cubrir ese retardo para no bloquear
+            # al productor
+            self.audio = _PipeFeeder(os.fdopen(audio_w, "wb"), audio_queue_size)
+            self.audio.start()
+
+    def write_frame(self, frame):
+        self.video.queue.put(np.ascontiguousarray(frame, dtype=np.uint8))
+
+    def write_audio(self, chunk):
+        if self.audio is not None and chunk is not None:
+            # Copia: el bloque suele ser una vista sobre el registro completo
+            # del frame y la cola de audio es larga
+            self.audio.queue.put(np.array(chunk, dtype=np.int16))
+
+    def release(self):
+        feeders = [f for f in (self.video, self.audio) if f is not None]
+        for feeder in feeders:
+            feeder.queue.put(_END)
+        for feeder in feeders:
+            feeder.join()
+        ret = self.proc.wait()
+        if ret != 0:
+            raise RuntimeError(f"ffmpeg terminó con código {ret}")
+
+
+class VideoOnlyWriter:
+    """
+    Misma interfaz que StreamingMuxer sobre un VideoWriter de OpenCV; el
+    audio se descarta.
+    """
+
+    def __init__(self, path, width, height, fps):
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        if not self.writer.isOpened():
+            raise RuntimeError(f"No se pudo abrir {path} para escritura")
+
+    def write_frame(self, frame):
+        self.writer.write(np.ascontiguousarray(frame, dtype=np.uint8))
+
+    def write_audio(self, chunk):
+        pass
+
+    def release(self):
+        self.writer.release()
+
+
+def open_muxer(path, width, height, fps, sample_rate=None, ffmpeg_bin=None, **kwargs):
+    """
+    StreamingMuxer si ffmpeg puede arrancar; si no (binario ausente o sin
+    pass_fds), VideoOnlyWriter con un aviso.
+    """
+    try:
+        return StreamingMuxer(path, width, height, fps, sample_rate, ffmpeg_bin, **kwargs)
+    except OSError as e:
+        print(f"ffmpeg no disponible ({e}); {path} se escribe con OpenCV y sin audio")
+        return VideoOnlyWriter(path, width, height, fps)
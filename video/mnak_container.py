@@ -0,0 +1,144 @@
+"""
+mnak_container.py
+Contenedor único (append-only) para la salida de MNAKFrameEncryptor
+
+Layout:
+    header   MAGIC, versión, ancho, alto, fps, muestras de audio por frame
+    records  [<Q longitud][ciphertext] por frame
+    index    <Q offset, <Q longitud por frame
+    footer   <Q offset del índice, <Q número de frames, INDEX_MAGIC
+"""
+
+import mmap
+import struct
+import numpy as np
+
+MAGIC = b'MNKC'
+INDEX_MAGIC = b'MNKI'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sIIIdI')
+_RECORD = struct.Struct('<Q')
+_FOOTER = struct.Struct('<QQ4s')
+_INDEX_DTYPE = np.dtype([('offset', '<u8'), ('length', '<u8')])
+
+
+class MNAKContainerWriter:
+    def __init__(self, path, width, height, fps, audio_samples_per_frame=0):
+        self.path = path
+        self.f = open(path, 'wb')
+        self.f.write(_HEADER.pack(MAGIC, VERSION, width, height, fps,
+                                  audio_samples_per_frame))
+        self.offsets = []
+        self.lengths = []
+
+    def append(self, ciphertext):
+        """
+        Agrega un frame cifrado y devuelve su índice.
+        """
+        length = len(ciphertext)
+        self.f.write(_RECORD.pack(length))
+        self.offsets.append(self.f.tell())
+        self.lengths.append(length)
+        self.f.write(ciphertext)
+        return len(self.offsets) - 1
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        if self.f.closed:
+            return
+        index = np.empty(len(self.offsets), dtype=_INDEX_DTYPE)
+        index['offset'] = self.offsets
+        index['length'] = self.lengths
+        index_offset = self.f.tell()
+        self.f.write(index.tobytes())
+        self.f.write(_FOOTER.pack(index_offset, len(index), INDEX_MAGIC))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MNAKContainerReader:
+    """
+    Lee el contenedor vía mmap. reader[i] devuelve un memoryview sobre el
+    ciphertext del frame i (sin copia), utilizable directamente en decrypt().
+    Si el archivo no tiene índice (escritura en curso o interrumpida) se
+    reconstruye recorriendo los registros.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, 'rb')
+        try:
+            # mmap no admite archivos vacíos y sin header no hay nada que leer
+            if self.f.seek(0, 2) < _HEADER.size:
+                raise ValueError(f"Contenedor vacío/truncado: {path}")
+            self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self.f.close()
+            raise
+
+        try:
+            magic, version, self.width, self.height, self.fps, \
+                self.audio_samples_per_frame = _HEADER.unpack_from(self.mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f"Magic number inválido: {magic}")
+            if version != VERSION:
+                raise ValueError(f"Versión de contenedor no soportada: {version}")
+
+            self.index = self._read_index()
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_index(self):
+        size = len(self.mm)
+        if size >= _HEADER.size + _FOOTER.size:
+            index_offset, n_frames, magic = _FOOTER.unpack_from(self.mm, size - _FOOTER.size)
+            if magic == INDEX_MAGIC:
+                return np.frombuffer(self.mm, dtype=_INDEX_DTYPE,
+                                     count=n_frames, offset=index_offset)
+        return self._scan_index(size)
+
+    def _scan_index(self, size):
+        entries = []
+        pos = _HEADER.size
+        while pos + _RECORD.size <= size:
+            (length,) = _RECORD.unpack_from(self.mm, pos)
+            start = pos + _RECORD.size
+            if start + length > size:
+                break  # registro incompleto al final
+            entries.append((start, length))
+            pos = start + length
+        return np.array(entries, dtype=_INDEX_DTYPE)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        offset, length = self.index[i]
+        return memoryview(self.mm)[int(offset):int(offset) + int(length)]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        # Los memoryview devueltos deben liberarse antes de cerrar
+        self.index = None
+        try:
+            self.mm.close()  # BufferError si queda alguna vista viva
+        finally:
+            self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,131 @@
+"""
+raw_sink.py
+Sink sin pérdidas para frames cifrados (AESCFBFrameEncryptor/AESCTRFrameEncryptor)
+
+El ciphertext no se comprime y un códec con pérdidas lo destruye, así que se
+escribe tal cual: un header con metadatos seguido de los frames de tamaño
+fijo, por lo que el frame i está en HEADER + i * frame_bytes (seekable).
+"""
+
+import os
+import struct
+import numpy as np
+
+from video.video_io import create_writer
+
+MAGIC = b'RAWC'
+VERSION = 1
+
+# magic, versión, ancho, alto, canales, fps, número de frames, modo de cifrado
+_HEADER = struct.Struct('<4sIIIIdQ8s')
+
+
+def _write_all(fd, buffers):
+    # writev puede escribir parcialmente; reintenta con lo que falte
+    if not hasattr(os, 'writev'):
+        for b in buffers:
+            os.write(fd, b)
+        return
+    views = [memoryview(b).cast('B') for b in buffers]
+    while views:
+        written = os.writev(fd, views)
+        while views and written >= len(views[0]):
+            written -= len(views[0])
+            views.pop(0)
+        if views and written:
+            views[0] = views[0][written:]
+
+
+class RawCipherWriter:
+    """
+    Acumula `batch_frames` frames y los escribe con un único writev. Si se
+    indica `preview_path`, uno de cada `preview_every` frames se escribe
+    además a un video de previsualización (con pérdidas, solo para mirar).
+    """
+
+    def __init__(self, path, width, height, fps, mode, channels=3,
+                 batch_frames=16, preview_path=None, preview_every=10):
+        self.path = path
+        self.width, self.height, self.channels = width, height, channels
+        self.fps = fps
+        self.mode = mode
+        self.frame_bytes = width * height * channels
+        self.batch_frames = batch_frames
+        self.pending = []
+        self.frame_count = 0
+
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+        _write_all(self.fd, [self._header()])
+
+        self.preview = None
+        self.preview_every = preview_every
+        if preview_path is not None and preview_every > 0:
+            self.preview = create_writer(preview_path, max(fps / preview_every, 1), (width, height))
+
+    def _header(self):
+        return _HEADER.pack(MAGIC, VERSION, self.width, self.height, self.channels,
+                            self.fps, self.frame_count, self.mode.encode().ljust(8, b'\0'))
+
+    def write(self, frame):
+        if frame.nbytes != self.frame_bytes:
+            raise ValueError(f"Frame de {frame.nbytes} bytes, se esperaban {self.frame_bytes}")
+        if self.preview is not None and self.frame_count % self.preview_every == 0:
+            self.preview.write(frame)
+
+        self.pending.append(np.ascontiguousarray(frame))
+        self.frame_count += 1
+        if len(self.pending) >= self.batch_frames:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            _write_all(self.fd, self.pending)
+            self.pending = []
+
+    def release(self):
+        if self.fd is None:
+            return
+        self.flush()
+        # Actualizar el número de frames en el header
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        _write_all(self.fd, [self._header()])
+        os.close(self.fd)
+        self.fd = None
+        if self.preview is not None:
+            self.preview.release()
+
+
+class RawCipherReader:
+    """
+    Acceso aleatorio por memmap: reader[i] es una vista (alto, ancho, canales).
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+        magic, version, self.width, self.height, self.channels, self.fps, \
+            frame_count, mode = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"Magic number inválido: {magic}")
+        if version != VERSION:
+            raise ValueError(f"Versión no soportada: {version}")
+        self.mode = mode.rstrip(b'\0').decode()
+
+        frame_shape = (self.height, self.width, self.channels)
+        frame_bytes = int(np.prod(frame_shape))
+        # Si la escritura no terminó, el header aún dice 0: usar el tamaño
+        available = (os.path.getsize(path) - _HEADER.size) // frame_bytes
+        self.frame_count = frame_count or available
+
+        self.frames = np.memmap(path, dtype=np.uint8, mode='r', offset=_HEADER.size,
+                                shape=(self.frame_count,) + frame_shape) \
+            if self.frame_count else np.empty((0,) + frame_shape, dtype=np.uint8)
+
+    def __len__(self):
+        return self.frame_count
+
+    def __getitem__(self, i):
+        return self.frames[i]
+
+    def __iter__(self):
+        return iter(self.frames)